@@ -1,19 +1,68 @@
 import logging
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Header, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from anyio import from_thread
 from fastapi.middleware.cors import CORSMiddleware  # Import CORS middleware
 import os
 import openai
 from dotenv import load_dotenv
-from backend import BuildingDataProcessor
+from backend import (
+    CALCULATORS, RESULTS, calculate_batch, calculate_with_stats, disable_pattern_profiling, enable_pattern_profiling,
+    pattern_profiler,
+)
+from executor import CalculationExecutor, ExecutorBusy, SingleFlight
+from auth import SessionSigner
+from ratelimit import RateLimiter, TokenBucket, bucket_store_from_env, parse_rate
+from static_page import StaticPage
+from log_pipeline import configure_logging, logging_stats
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from tracing import Tracer
+from ingest import ingest, map_columns, render_row
+from sweep import Sweep, SweepTooLarge, goal_seek, parse_goal_seek, parse_sweep
 import bcrypt
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional, Union
 import asyncio
+import csv
+import io
+import json
+import math
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from starlette.websockets import WebSocketState
 
 # Load environment variables
 load_dotenv()
-app = FastAPI()
+
+# Logging is formatted and written on a background thread; see log_pipeline for the LOG_* settings
+configure_logging()
+logger = logging.getLogger("app")
+ws_logger = logging.getLogger("app.ws")
+
+# Calculations run on this pool so a slow message never blocks the event loop
+executor = CalculationExecutor.from_env()
+
+# The landing page is read and compressed once; WATCH_PAGES=true reloads it on edit
+landing_page = StaticPage("interface_secure.html")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    executor.start()
+    manager.start()
+    watcher = None
+    if os.getenv('WATCH_PAGES', 'false').lower() in ('1', 'true', 'yes'):
+        watcher = asyncio.create_task(landing_page.watch())
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    manager.stop()
+    executor.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 
@@ -25,90 +74,710 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load credentials from the YAML file
+# Load credentials from the YAML file, indexed by username
 def load_credentials():
     with open('config_users.yml', 'r') as file:
         config = yaml.safe_load(file)
-        return config['credentials']
+        return {user['username']: user for user in config['credentials']}
 
 credentials = load_credentials()
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+
+def dummy_password_hash():
+    """A hash of a random password at the cost of the configured ones, checked for unknown usernames."""
+    costs = [int(user['password_hash'].split('$')[2]) for user in credentials.values()]
+    return bcrypt.hashpw(os.urandom(16), bcrypt.gensalt(rounds=max(costs, default=12))).decode('utf-8')
+
+# Unknown names then take as long to reject as a wrong password, so timing does not reveal accounts
+DUMMY_PASSWORD_HASH = dummy_password_hash()
+# Signed session tokens let repeat logins and the /ws handshake skip bcrypt
+sessions = SessionSigner.from_env()
+REQUIRE_WS_TOKEN = os.getenv('REQUIRE_WS_TOKEN', 'true').lower() in ('1', 'true', 'yes')
+# Requests a single socket may have in flight with ?protocol=json
+WS_MAX_IN_FLIGHT = int(os.getenv('WS_MAX_IN_FLIGHT', 8))
+# Per-socket limits: messages allowed per period, and messages waiting to be processed
+WS_RATE_CALLS, WS_RATE_PERIOD = parse_rate(os.getenv('WS_RATE', '30/10'))
+WS_QUEUE_SIZE = int(os.getenv('WS_QUEUE_SIZE', 16))
+# Login attempts are throttled per client address and per username before any bcrypt work.
+# The client address is request.client.host: behind a reverse proxy (Render's load balancer)
+# that is the proxy's IP, one bucket for everyone, unless uvicorn runs with --proxy-headers
+# and --forwarded-allow-ips naming the proxy so the X-Forwarded-For client is used instead.
+login_store = bucket_store_from_env()
+login_limiters = {
+    'client': RateLimiter.from_spec('login-client', os.getenv('LOGIN_RATE_CLIENT', '10/60'), login_store),
+    'username': RateLimiter.from_spec('login-username', os.getenv('LOGIN_RATE_USERNAME', '5/60'), login_store),
+}
 openai.api_key = os.getenv('OPENAI_API_KEY')  # Load API Key from environment
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = []
+    """Process-wide registry of open WebSockets with a single heartbeat scheduler.
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logging.debug(f"Connected: {websocket.client}")
+    Protocol-level ping/pong is left to the ASGI server (uvicorn's
+    --ws-ping-interval/--ws-ping-timeout), which closes dead peers; the app never
+    sends its own keep-alive frames. One task drives a hashed timer wheel: each
+    socket sits in the slot where its idle deadline falls, and every tick only
+    the current slot is inspected, reaping sockets that are idle or no longer
+    connected and re-filing the rest. Cost stays flat with thousands of idle tabs.
+    """
 
-    def disconnect(self, websocket: WebSocket):
+    def __init__(self, idle_timeout: float = 1800.0, tick: float = 5.0):
+        self.idle_timeout = idle_timeout
+        self.tick = tick
+        self.active_connections = {}  # websocket -> monotonic time of last activity
+        self.wheel = [set() for _ in range(math.ceil(idle_timeout / tick) + 1)]
+        self.slots = {}  # websocket -> index of the wheel slot it is filed in
+        self.cursor = 0
+        self.opened_total = 0
+        self.closed_total = 0
+        self.reaped_total = 0
+        self.limit_counts = Counter()
+        self.queues = {}  # websocket -> its queue of messages waiting to be processed
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _schedule(self, websocket: WebSocket, delay: float):
+        offset = min(len(self.wheel) - 1, max(1, math.ceil(delay / self.tick)))
+        self._unschedule(websocket)
+        slot = (self.cursor + offset) % len(self.wheel)
+        self.wheel[slot].add(websocket)
+        self.slots[websocket] = slot
+
+    def _unschedule(self, websocket: WebSocket):
+        slot = self.slots.pop(websocket, None)
+        if slot is not None:
+            self.wheel[slot].discard(websocket)
+
+    async def connect(self, websocket: WebSocket, subprotocol: str = None):
+        await websocket.accept(subprotocol=subprotocol)
+        self.active_connections[websocket] = time.monotonic()
+        self._schedule(websocket, self.idle_timeout)
+        self.opened_total += 1
+        ws_logger.debug("Connected: %s", websocket.client)
+
+    def touch(self, websocket: WebSocket):
+        """Record activity on a socket; its wheel slot is corrected lazily on the next visit."""
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logging.debug(f"Disconnected: {websocket.client}")
+            self.active_connections[websocket] = time.monotonic()
 
-    async def keep_alive(self, websocket: WebSocket):
-        try:
-            while websocket in self.active_connections:
-                await websocket.send_text("")  # Send ping message to keep the connection alive
-                await asyncio.sleep(30)  # Ping every 30 seconds (adjust as needed)
-        except Exception as e:
-            logging.error(f"Keep-alive failed: {e}")
-            self.disconnect(websocket)
+    def count_limit(self, limit: str):
+        """Count a message rejected by a per-connection limit."""
+        self.limit_counts[limit] += 1
+
+    def queued(self):
+        """Messages waiting to be processed across all sockets."""
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    def disconnect(self, websocket: WebSocket):
+        self.queues.pop(websocket, None)
+        # Closed sockets must not stay referenced by the wheel until their deadline comes round
+        self._unschedule(websocket)
+        if self.active_connections.pop(websocket, None) is not None:
+            self.closed_total += 1
+            ws_logger.debug("Disconnected: %s", websocket.client)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self._advance()
+            except Exception as e:
+                ws_logger.error(f"Connection heartbeat failed: {e}")
+
+    async def _advance(self):
+        self.cursor = (self.cursor + 1) % len(self.wheel)
+        due, self.wheel[self.cursor] = self.wheel[self.cursor], set()
+        now = time.monotonic()
+        for websocket in due:
+            self.slots.pop(websocket, None)
+            last_seen = self.active_connections.get(websocket)
+            if last_seen is None:
+                continue  # Already disconnected
+            if websocket.client_state != WebSocketState.CONNECTED:
+                self.disconnect(websocket)
+            elif now - last_seen >= self.idle_timeout:
+                ws_logger.debug("Closing idle connection: %s", websocket.client)
+                self.disconnect(websocket)
+                self.reaped_total += 1
+                try:
+                    await websocket.close(code=1001)
+                except Exception as e:
+                    ws_logger.debug("Closing idle connection failed: %s", e)
+            else:
+                self._schedule(websocket, self.idle_timeout - (now - last_seen))
+
+    def stats(self):
+        return {
+            "active": len(self.active_connections),
+            "opened_total": self.opened_total,
+            "closed_total": self.closed_total,
+            "reaped_idle_total": self.reaped_total,
+            "rate_limited_total": self.limit_counts["rate_limited"],
+            "dropped_total": self.limit_counts["dropped"],
+        }
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         try:
-            logging.debug(f"Sending message to {websocket.client}: {message}")
+            ws_logger.debug("Sending message to %s: %s", websocket.client, message)
             await websocket.send_text(message)
         except Exception as e:
-            logging.error(f"Failed to send message: {e}")
+            ws_logger.error(f"Failed to send message: {e}")
             self.disconnect(websocket)
 
+# One hub for the whole process
+manager = ConnectionManager(idle_timeout=float(os.getenv('WS_IDLE_TIMEOUT', 1800)))
+
 @app.get("/", response_class=HTMLResponse)
-async def get():
-    with open("interface_secure.html", "r") as file:
-        html_content = file.read()
-    return HTMLResponse(content=html_content)
+async def get(request: Request):
+    return landing_page.response(request)
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
-def validate_login(login_data: LoginRequest):
-    # Iterate over each user in the credentials list
-    for user in credentials:
-        # Check if the username matches
-        if login_data.username == user['username']:
-            # Check if the password matches
-            if bcrypt.checkpw(login_data.password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                return True
-        # If no match found, raise an exception
+async def validate_login(login_data: LoginRequest):
+    user = credentials.get(login_data.username)
+    password_hash = user['password_hash'] if user is not None else DUMMY_PASSWORD_HASH
+    # bcrypt takes ~250 ms per check, so keep it off the event loop
+    password_ok = await asyncio.to_thread(
+        bcrypt.checkpw, login_data.password.encode('utf-8'), password_hash.encode('utf-8')
+    )
+    if user is None or not password_ok:
         raise HTTPException(status_code=401, detail="Invalid username or password")
+    return True
+
+def bearer_token(authorization: str = Header(None)):
+    """Return the token from an 'Authorization: Bearer <token>' header, if any."""
+    if authorization and authorization.lower().startswith('bearer '):
+        return authorization[7:].strip()
+    return None
+
+async def throttle_login(client: str, username: str):
+    """Raise 429 if either the client or the username has run out of login attempts.
+
+    client is request.client.host; see login_limiters for running behind a proxy.
+    """
+    for limiter, key in ((login_limiters['client'], client), (login_limiters['username'], username)):
+        # The SQLite store waits on a file lock, so keep it off the event loop
+        retry_after = await asyncio.to_thread(limiter.check, key)
+        if retry_after:
+            logger.warning(f"Login throttled by {limiter.name} for {key}")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many login attempts. Please try again later.",
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
+
 @app.post("/validate_login")
-async def validate_login_endpoint(login_data: LoginRequest):
-    validate_login(login_data)
-    return {"success": True, "message": "Login successful"}
+async def validate_login_endpoint(request: Request, login_data: LoginRequest):
+    await throttle_login(request.client.host if request.client else 'unknown', login_data.username)
+    await validate_login(login_data)
+    token = sessions.issue(login_data.username)
+    return {
+        "success": True,
+        "message": "Login successful",
+        "token": token,
+        "expires_in": sessions.expires_in(token),
+    }
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    manager = ConnectionManager()
-    await manager.connect(websocket)
-    logging.debug("Client connected to WebSocket.")
+@app.post("/renew_session")
+async def renew_session_endpoint(token: str = Depends(bearer_token)):
+    # No password and no bcrypt; the new token keeps the original login time, so
+    # renewals stop SESSION_MAX_AGE after the password was last checked
+    renewed = sessions.renew(token) if token else None
+    if renewed is None:
+        raise HTTPException(status_code=401, detail="Session expired. Please log in again.")
+    return {"success": True, "token": renewed, "expires_in": sessions.expires_in(renewed)}
+
+# Identical queries arriving while one is being computed share its result
+flights = SingleFlight()
+
+# Prometheus metrics, served at /metrics
+registry = MetricsRegistry()
+CALC_REQUESTS = registry.counter("calc_requests_total", "Messages processed, by intent and outcome", ("intent", "outcome"))
+CALC_SECONDS = registry.histogram("calc_seconds", "Processing time of one message in the worker, by intent", ("intent",))
+CALC_STAGE_SECONDS = registry.histogram("calc_stage_seconds", "Time spent in each processing stage", ("stage",))
+CALC_FAILURES = registry.counter("calc_failures_total", "Messages that got no calculated answer, by reason", ("reason",))
+WS_REPLY_SECONDS = registry.histogram("ws_reply_seconds", "Time from a message being queued to its reply, by status", ("status",))
+registry.gauge("ws_connections_active", "Open WebSocket connections", lambda: len(manager.active_connections))
+registry.counter_callback("ws_connections_opened_total", "WebSocket connections accepted", lambda: manager.opened_total)
+registry.counter_callback("ws_connections_reaped_total", "Idle WebSocket connections closed", lambda: manager.reaped_total)
+registry.counter_callback("ws_messages_rejected_total", "Messages refused by a per-socket limit", lambda: dict(manager.limit_counts), label="limit")
+registry.gauge("ws_queued_messages", "Messages waiting in per-socket queues", lambda: manager.queued())
+registry.gauge("calc_executor_pending", "Calculations running or waiting in the executor", lambda: executor.pending)
+registry.gauge("calc_in_flight", "Distinct calculations in flight", lambda: flights.stats()["in_flight"])
+registry.counter_callback("calc_coalesced_total", "Messages answered by an identical calculation already in flight", lambda: flights.coalesced)
+# This process's cache only, never the shared store (counting it queries the file on the loop);
+# with CALC_EXECUTOR=process use calc_requests_total{outcome="cached"}
+registry.counter_callback(
+    "result_cache_lookups_total", "Result cache lookups by result",
+    lambda: {key: value for key, value in RESULTS.stats().items() if key in ("hits", "store_hits", "misses")}, label="result",
+)
+registry.gauge("result_cache_hit_ratio", "Fraction of result cache lookups that hit", lambda: RESULTS.stats()["hit_rate"])
+registry.gauge("log_queued_records", "Log records waiting for the writer thread", lambda: logging_stats().get("queued", 0))
+
+def record_calculation(stats):
+    intent = stats["intent"] or "none"
+    CALC_REQUESTS.inc(intent, stats["outcome"])
+    for stage, seconds in stats["timings"].items():
+        CALC_STAGE_SECONDS.observe(seconds, stage)
+    CALC_SECONDS.observe(sum(stats["timings"].values()), intent)
+
+# Opt-in sampled tracing of messages; TRACE_SAMPLE=0.01 traces one in a hundred
+tracer = Tracer.from_env()
+
+# PATTERN_PROFILE=true times every catalog pattern; see /patterns/profile
+if os.getenv('PATTERN_PROFILE', 'false').lower() in ('1', 'true', 'yes'):
+    enable_pattern_profiling()
+
+def add_calculation_spans(trace, stats):
+    """Add the worker's stage timings to trace, naming the calculation stage after its process_* method."""
+    start = stats["started_at"]
+    for stage, seconds in stats["timings"].items():
+        if stage == "calculate":
+            stage = stats["calculator"] or "fallback"
+        trace.span(stage, start, start + seconds)
+        start += seconds
+    trace.attributes["intent"] = stats["intent"]
+    trace.attributes["outcome"] = stats["outcome"]
+
+async def run_calculation(query: str):
+    """Compute one query, sharing the work with identical queries in flight.
+
+    Returns (status, response, stats), where stats is None unless a
+    calculation ran.
+    """
+    # Normalize case for all processing
+    normalized_data = query.lower()
+    return await flights.run(normalized_data, compute, normalized_data)
+
+BUSY = "The server is busy. Please try again in a moment."
+TIMED_OUT = "The calculation took too long. Please try again."
+CALCULATION_FAILED = "The calculation failed. Please check the input and try again."
+
+async def compute(normalized_data: str):
+    """Run one normalized query on the executor and return (status, response, stats)."""
+    try:
+        response, stats = await executor.submit(calculate_with_stats, normalized_data)  # Call the function from backend.py
+    except ExecutorBusy:
+        CALC_FAILURES.inc("busy")
+        logger.warning("Calculation queue is full, rejecting message")
+        return "busy", BUSY, None
+    except asyncio.TimeoutError:
+        CALC_FAILURES.inc("timeout")
+        logger.warning(f"Calculation timed out after {executor.timeout}s")
+        return "timeout", TIMED_OUT, None
+    except Exception:
+        CALC_FAILURES.inc("error")
+        raise
+    record_calculation(stats)
+    return "ok", response, stats
+
+# Batches: at most BATCH_MAX_ITEMS items, evaluated BATCH_CHUNK_SIZE at a time per executor call
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 1000))
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 50))
+# Chunk calls all batches in this process may have in the executor at once; the rest of
+# its workers and CALC_MAX_PENDING stay free for chat messages
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', max(1, executor.workers // 2)))
+batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+class BatchItem(BaseModel):
+    """A query, optionally pinned to an intent, or an intent with {"key or label": value} parameters."""
+    query: Optional[str] = None
+    intent: Optional[str] = None
+    params: Optional[Dict[str, Union[float, str]]] = None
+
+class BatchRequest(BaseModel):
+    items: List[Union[str, BatchItem]]
+
+def batch_entry(item):
+    """Turn one batch item into (query, intent), or raise ValueError saying why it is invalid."""
+    if isinstance(item, str):
+        return item, None
+    if item.intent is not None and item.intent not in CALCULATORS:
+        raise ValueError(f"Unknown intent '{item.intent}'")
+    if item.query is not None and item.params is None:
+        return item.query, item.intent
+    if item.params is not None and item.query is None:
+        if item.intent is None:
+            raise ValueError("An item with 'params' also needs an 'intent'")
+        # Parameters are named like ingest columns: a key ("total_parking_space") or a label
+        mapping = map_columns(list(item.params))
+        unknown = [name for name in item.params if name not in mapping]
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {', '.join(unknown)}")
+        return render_row(item.params, mapping), item.intent
+    raise ValueError("Each item needs either 'query' or 'params'")
+
+async def run_chunk(entries):
+    """Evaluate one chunk of (query, intent) entries in a single executor call."""
+    async with batch_slots:
+        try:
+            outcomes = await executor.submit(calculate_batch, entries)
+        except ExecutorBusy:
+            CALC_FAILURES.inc("busy", amount=len(entries))
+            return [("busy", BUSY)] * len(entries)
+        except asyncio.TimeoutError:
+            CALC_FAILURES.inc("timeout", amount=len(entries))
+            return [("timeout", TIMED_OUT)] * len(entries)
+    results = []
+    for status, response, stats in outcomes:
+        if stats is None:
+            CALC_FAILURES.inc("error")
+            response = CALCULATION_FAILED
+        else:
+            record_calculation(stats)
+        results.append((status, response))
+    return results
+
+async def run_entries(entries):
+    """Evaluate (query, intent) entries in parallel chunks and return one (status, response) per entry."""
+    chunks = [entries[start:start + BATCH_CHUNK_SIZE] for start in range(0, len(entries), BATCH_CHUNK_SIZE)]
+    outcomes = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return [outcome for chunk_outcomes in outcomes for outcome in chunk_outcomes]
+
+async def run_batch(items):
+    """Evaluate batch items in parallel chunks and return one {"status", "result"} per item, in order.
+
+    Chunks from every batch in the process share BATCH_CONCURRENCY executor
+    calls, so batches queue behind each other instead of filling the
+    executor and bouncing chat messages as busy.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, batch_entry(item)))
+        except ValueError as e:
+            results[index] = {"status": "invalid", "result": str(e)}
+    outcomes = await run_entries([entry for _, entry in valid])
+    for (index, _), (status, response) in zip(valid, outcomes):
+        results[index] = {"status": status, "result": response}
+    return results
+
+# What-if sweeps: at most SWEEP_MAX_POINTS grid points, evaluated SWEEP_CHUNK_SIZE at a time
+SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 1_000_000))
+SWEEP_CHUNK_SIZE = int(os.getenv('SWEEP_CHUNK_SIZE', 65536))
+SWEEP_POINTS = registry.counter("calc_sweep_points_total", "Grid points evaluated by what-if sweeps, by kernel", ("kernel",))
+
+class SweepRequest(BaseModel):
+    """Either query ("runoff, rainfall = 20..80 step 5, ...") or calculator with {input: value, range or list}."""
+    query: Optional[str] = None
+    calculator: Optional[str] = None
+    inputs: Optional[Dict[str, Union[float, str, List[float]]]] = None
+
+class GoalSeekRequest(BaseModel):
+    """Either query ("renewable energy, energy generated = ?, energy consumption = 50000, target = 10") or the fields."""
+    query: Optional[str] = None
+    calculator: Optional[str] = None
+    inputs: Dict[str, float] = {}
+    solve_for: Optional[str] = None
+    target: Optional[float] = None
+    search: Optional[str] = None
+    goal: Optional[str] = None
+
+# Ingestion: uploads up to INGEST_MAX_BYTES, spooled to disk past INGEST_SPOOL_BYTES, INGEST_CHUNK_SIZE rows per batch
+INGEST_MAX_BYTES = int(os.getenv('INGEST_MAX_BYTES', 100 * 1024 * 1024))
+INGEST_SPOOL_BYTES = int(os.getenv('INGEST_SPOOL_BYTES', 1024 * 1024))
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 200))
+INGEST_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+INVALID_FRAME = 'Invalid frame. Expected {"id": ..., "query": "..."} or {"id": ..., "batch": [...]}.'
+SLOW_DOWN = "You are sending messages too quickly. Please slow down."
+DROPPED = "Too many messages are waiting to be processed. This one was dropped."
+
+def parse_frame(frame):
+    """The query string or BatchRequest carried by a JSON frame, or None if the frame is invalid."""
+    if not isinstance(frame, dict) or "id" not in frame:
+        return None
+    if isinstance(frame.get("query"), str):
+        return frame["query"]
+    if isinstance(frame.get("batch"), list) and len(frame["batch"]) <= BATCH_MAX_ITEMS:
+        try:
+            return BatchRequest.model_validate({"items": frame["batch"]})
+        except ValidationError:
+            return None
+    return None
+
+async def serve_connection(websocket: WebSocket, framed: bool):
+    """Read messages from a socket and answer them through a bounded queue.
+
+    In plain-text mode one worker answers messages in order. With framed=True
+    messages are {"id", "query"} JSON frames, WS_MAX_IN_FLIGHT workers process
+    them concurrently, and each {"id", "status", "result"} reply is sent as soon
+    as it is ready, so replies may arrive out of order. A {"id", "batch"} frame
+    is answered with one reply whose result lists a {"status", "result"} per item.
+
+    The reader keeps draining the socket. A message over the per-socket rate
+    (a batch frame counts once per item) gets a "slow_down" reply, and one that finds the queue full gets a
+    "dropped" reply, instead of piling up in buffers.
+    """
+    bucket = TokenBucket(WS_RATE_CALLS, WS_RATE_CALLS / WS_RATE_PERIOD)
+    queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+    manager.queues[websocket] = queue
+    send_lock = asyncio.Lock()
+
+    async def reply(request_id, status, result, trace=None):
+        if framed:
+            frame = {"id": request_id, "status": status, "result": result}
+            if trace is not None:
+                frame["trace_id"] = trace.trace_id
+            message = json.dumps(frame)
+        else:
+            message = result
+        async with send_lock:
+            await manager.send_personal_message(message, websocket)
+
+    async def worker():
+        while True:
+            request_id, query, queued_at, trace = await queue.get()
+            dequeued_at = time.perf_counter()
+            stats = None
+            try:
+                if isinstance(query, BatchRequest):
+                    status, response = "ok", await run_batch(query.items)
+                else:
+                    status, response, stats = await run_calculation(query)
+            except Exception as e:
+                logger.error(f"Calculation failed for {query!r}: {e}")
+                status, response = "error", CALCULATION_FAILED
+            ws_logger.debug("Response: %s", response)
+            sending_at = time.perf_counter()
+            await reply(request_id, status, response, trace)
+            sent_at = time.perf_counter()
+            WS_REPLY_SECONDS.observe(sent_at - queued_at, status)
+            if trace is not None:
+                trace.span("queue", queued_at, dequeued_at)
+                if stats is not None:
+                    add_calculation_spans(trace, stats)
+                trace.span("send", sending_at, sent_at)
+                trace.attributes["status"] = status
+                tracer.finish(trace)
+
+    workers = [asyncio.create_task(worker()) for _ in range(WS_MAX_IN_FLIGHT if framed else 1)]
     try:
         while True:
             data = await websocket.receive_text()
-            logging.debug(f"Received message from client: {data}")
-            # Normalize case for all processing
-            normalized_data = data.lower()
-            processor = BuildingDataProcessor(normalized_data)  # Call the function from backend.py
-            response = processor.process()  # Assuming 'process' returns the result
-            logging.debug(f"Response: {response}")
-            await manager.send_personal_message(response, websocket)
+            trace = tracer.start()
+            manager.touch(websocket)
+            ws_logger.debug("Received message from client: %s", data)
+            request_id, query = None, data
+            if framed:
+                try:
+                    frame = json.loads(data)
+                except ValueError:
+                    frame = None
+                query = parse_frame(frame)
+                if query is None:
+                    await reply(frame.get("id") if isinstance(frame, dict) else None, "error", INVALID_FRAME)
+                    continue
+                request_id = frame["id"]
+            if bucket.take(len(query.items) if isinstance(query, BatchRequest) else 1):
+                manager.count_limit("rate_limited")
+                await reply(request_id, "slow_down", SLOW_DOWN)
+                continue
+            try:
+                queued_at = time.perf_counter()
+                if trace is not None:
+                    trace.span("receive", trace.started, queued_at)
+                queue.put_nowait((request_id, query, queued_at, trace))
+            except asyncio.QueueFull:
+                manager.count_limit("dropped")
+                await reply(request_id, "dropped", DROPPED)
+    finally:
+        for task in workers:
+            task.cancel()
+
+# Browsers pass the session token as new WebSocket(url, ["session", token]). That keeps it out
+# of the URL, which servers and proxies log; ?token= still works for other clients.
+SESSION_SUBPROTOCOL = "session"
+
+def websocket_token(websocket: WebSocket, token: str = None):
+    """The token offered after the "session" subprotocol, otherwise the ?token= query parameter."""
+    offered = websocket.scope.get("subprotocols") or []
+    if SESSION_SUBPROTOCOL in offered[:-1]:
+        return offered[offered.index(SESSION_SUBPROTOCOL) + 1]
+    return token
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, token: str = None, protocol: str = "text"):
+    token = websocket_token(websocket, token)
+    # A browser that offered subprotocols fails the handshake unless one is chosen
+    subprotocol = SESSION_SUBPROTOCOL if SESSION_SUBPROTOCOL in (websocket.scope.get("subprotocols") or []) else None
+    if REQUIRE_WS_TOKEN and not (token and sessions.verify(token)):
+        ws_logger.warning(f"Rejected WebSocket without a valid session token: {websocket.client}")
+        # Accept first: a close before the handshake is an HTTP 403 and the browser only sees 1006
+        await websocket.accept(subprotocol=subprotocol)
+        await websocket.close(code=1008, reason="Session expired")
+        return
+    await manager.connect(websocket, subprotocol)
+    ws_logger.debug("Client connected to WebSocket.")
+    try:
+        await serve_connection(websocket, framed=(protocol == "json"))
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
-        logging.error(f"Error in websocket endpoint: {e}")
+        ws_logger.error(f"Error in websocket endpoint: {e}")
+    finally:
         manager.disconnect(websocket)
+
+def require_session(token: str = Depends(bearer_token)):
+    """Return the username of the bearer session token, or raise 401."""
+    username = sessions.verify(token) if token else None
+    if username is None:
+        raise HTTPException(status_code=401, detail="A valid session token is required")
+    return username
+
+@app.get("/status")
+async def status():
+    # With CALC_EXECUTOR=process each worker keeps its own result cache; these are this process's numbers
+    return {
+        "connections": manager.stats(),
+        "calculations": flights.stats(),
+        # The shared store is counted with a query that may wait on its file lock
+        "result_cache": await asyncio.to_thread(RESULTS.stats, True),
+        "logging": logging_stats(),
+        "tracing": {"sample_rate": tracer.sample_rate, "recorded_total": tracer.recorded},
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.post("/calculate/batch")
+async def calculate_batch_endpoint(request: BatchRequest, username: str = Depends(require_session)):
+    """Evaluate many queries or parameter sets; results come back in request order."""
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may hold at most {BATCH_MAX_ITEMS} items")
+    return {"results": await run_batch(request.items)}
+
+@app.post("/sweep")
+async def sweep_endpoint(request: SweepRequest, username: str = Depends(require_session)):
+    """Evaluate a calculator over every combination of its inputs, streamed back as JSON lines.
+
+    The first line describes the kernel and grid size; each following line
+    is one point with its inputs and result (null where the calculator
+    would not give a number).
+    """
+    try:
+        if request.query is not None:
+            calculator, inputs = parse_sweep(request.query)
+        elif request.calculator and request.inputs:
+            calculator, inputs = request.calculator, request.inputs
+        else:
+            raise ValueError("Send either 'query' or 'calculator' with 'inputs'")
+        grid = Sweep(calculator, inputs, SWEEP_MAX_POINTS)
+    except SweepTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    SWEEP_POINTS.inc(grid.kernel.name, amount=grid.points)
+    # A plain generator is iterated on the threadpool, so the event loop stays free while chunks are evaluated
+    return StreamingResponse(grid.rows(SWEEP_CHUNK_SIZE), media_type="application/x-ndjson")
+
+@app.post("/goal-seek")
+async def goal_seek_endpoint(request: GoalSeekRequest, username: str = Depends(require_session)):
+    """Solve for the smallest input that brings a calculator's result to a target."""
+    if request.query is not None:
+        try:
+            problem = parse_goal_seek(request.query)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif request.calculator and request.solve_for and request.target is not None:
+        problem = request.model_dump(exclude={"query"})
+    else:
+        raise HTTPException(status_code=400, detail="Send either 'query' or 'calculator', 'solve_for' and 'target'")
+    try:
+        return await executor.submit(
+            goal_seek, problem["calculator"], problem["inputs"], problem["solve_for"], problem["target"], problem["search"], problem["goal"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail=BUSY)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=TIMED_OUT)
+
+@app.post("/ingest")
+async def ingest_endpoint(request: Request, credits: str, output: str = "csv", input: str = None, columns: str = "",
+                          username: str = Depends(require_session)):
+    """Run the given credits on every row of a CSV or JSON lines inventory sent as the request body.
+
+    credits is a comma-separated list of calculators, columns optionally maps
+    headers to parameter keys ("Occupants=occupants,Type=building_type"),
+    and input defaults to jsonl for a JSON content type and csv otherwise.
+
+    The body is spooled to a temporary file (on disk past INGEST_SPOOL_BYTES)
+    rather than read while the response streams, which Starlette does not
+    allow; results are then streamed from it row chunk by row chunk. Each
+    chunk is calculated through the executor like a batch, so it shares the
+    batch slots, CALC_MAX_PENDING and CALC_TIMEOUT with everything else.
+    """
+    input_format = input or ("jsonl" if "json" in request.headers.get("content-type", "") else "csv")
+    mapping = dict((name.strip(), key.strip()) for name, _, key in (part.partition("=") for part in columns.split(",")) if key)
+    spool = tempfile.SpooledTemporaryFile(max_size=INGEST_SPOOL_BYTES)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > INGEST_MAX_BYTES:
+            spool.close()
+            raise HTTPException(status_code=413, detail=f"Uploads are limited to {INGEST_MAX_BYTES} bytes")
+        spool.write(chunk)
+    spool.seek(0)
+    lines = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+
+    def evaluate(entries):
+        # stream() runs on Starlette's threadpool; hand each chunk back to the loop and the executor
+        return from_thread.run(run_entries, entries)
+
+    try:
+        rows = ingest(lines, [credit.strip() for credit in credits.split(",")], input_format, output, mapping, INGEST_CHUNK_SIZE,
+                      evaluate)
+    except ValueError as e:
+        lines.close()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def stream():
+        try:
+            yield from rows
+        except (csv.Error, UnicodeDecodeError) as e:
+            # Headers are already sent; the output just ends at the bad row (or the first non-UTF-8 bytes)
+            logger.warning(f"Ingestion stopped: {e}")
+
+    return StreamingResponse(stream(), media_type=INGEST_MEDIA_TYPES[output], background=BackgroundTask(lines.close))
+
+@app.get("/traces")
+async def traces(trace_id: str = None, min_ms: float = 0.0, limit: int = 50, username: str = Depends(require_session)):
+    """Recent sampled traces, newest first, from the in-memory buffer."""
+    return {"traces": tracer.find(trace_id, min_ms, min(limit, 1000))}
+
+@app.get("/patterns/profile")
+async def pattern_profile(top: int = 10, username: str = Depends(require_session)):
+    # Only calculations run in this process are seen, so profile with CALC_EXECUTOR=thread
+    profiler = pattern_profiler()
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Pattern profiling is off")
+    return profiler.report(top)
+
+@app.post("/patterns/profile")
+async def toggle_pattern_profile(enabled: bool = True, username: str = Depends(require_session)):
+    """Start a fresh pattern profile, or stop profiling with enabled=false."""
+    if enabled:
+        enable_pattern_profiling()
+    else:
+        disable_pattern_profiling()
+    logger.info(f"Pattern profiling {'started' if enabled else 'stopped'} by {username}")
+    return {"enabled": enabled}
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(username: str = Depends(require_session)):
+    # Clearing the shared store is a DELETE that may wait on its file lock. Pool workers and other
+    # uvicorn workers see the new generation marker and drop their entries within a second
+    await asyncio.to_thread(RESULTS.invalidate)
+    logger.info(f"Result cache invalidated by {username}")
+    return {"success": True, "result_cache": await asyncio.to_thread(RESULTS.stats, True)}
@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+def _b64encode(data: bytes):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+class SessionSigner:
+    """Issues and verifies short-lived signed session tokens.
+
+    A token is "<payload>.<signature>". The payload is "<expiry>:<issued>:<username>"
+    and the signature is its HMAC-SHA256, both base64url encoded. Checking a
+    token costs one hash instead of another bcrypt round. issued is the time
+    of the password login and is carried over by renew(), so no chain of
+    renewals outlives max_age.
+    """
+
+    def __init__(self, secret: bytes, ttl: int = 3600, max_age: int = 43200):
+        self.secret = secret
+        self.ttl = ttl
+        self.max_age = max_age
+
+    @classmethod
+    def from_env(cls):
+        """Build a signer from SESSION_SECRET, SESSION_TTL and SESSION_MAX_AGE."""
+        secret = os.getenv("SESSION_SECRET")
+        if secret:
+            secret = secret.encode("utf-8")
+        else:
+            # Tokens then only stay valid within this process
+            logger.warning("SESSION_SECRET is not set, using a random per-process session secret")
+            secret = secrets.token_bytes(32)
+        return cls(secret, ttl=int(os.getenv("SESSION_TTL", 3600)), max_age=int(os.getenv("SESSION_MAX_AGE", 43200)))
+
+    def _sign(self, payload: bytes):
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()
+
+    def issue(self, username: str, issued: int = None):
+        """Return a token for username that expires after ttl seconds, or at max_age after issued."""
+        now = int(time.time())
+        issued = now if issued is None else issued
+        payload = f"{min(now + self.ttl, issued + self.max_age)}:{issued}:{username}".encode("utf-8")
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def verify(self, token: str):
+        """Return the username of a valid, unexpired token, otherwise None."""
+        claims = self._claims(token)
+        return claims and claims[2]
+
+    def renew(self, token: str):
+        """Return a fresh token for a valid one, keeping its login time; None once max_age is reached."""
+        claims = self._claims(token)
+        if claims is None or claims[1] + self.max_age <= time.time():
+            return None
+        return self.issue(claims[2], issued=claims[1])
+
+    def expires_in(self, token: str):
+        """Seconds until a valid token expires, otherwise 0."""
+        claims = self._claims(token)
+        return max(0, int(claims[0] - time.time())) if claims else 0
+
+    def _claims(self, token: str):
+        """Return (expiry, issued, username) of a valid, unexpired token, otherwise None."""
+        try:
+            encoded_payload, encoded_signature = token.split(".")
+            payload = _b64decode(encoded_payload)
+            signature = _b64decode(encoded_signature)
+        except (ValueError, AttributeError):
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        expiry, issued, username = (payload.decode("utf-8").split(":", 2) + ["", ""])[:3]
+        if not (expiry.isdigit() and issued.isdigit()) or int(expiry) < time.time():
+            return None
+        return int(expiry), int(issued), username
@@ -1,136 +1,696 @@
 import re
+import hashlib
+import inspect
+import json
 import logging
 import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from pattern_profiler import PatternProfiler
+
+logger = logging.getLogger(__name__)
+
+def _compile_patterns(sources):
+    """Compile the pattern sources once and freeze them into a read-only mapping."""
+    return MappingProxyType({key: re.compile(pattern, re.IGNORECASE) for key, pattern in sources.items()})
+
+# Compiled once at import and shared by every BuildingDataProcessor instance.
+PATTERNS = _compile_patterns({
+    "building_type": r"(commercial|institutional|residential|retail)",
+    "building_typee": r"(multi-residential|individual)",
+    "occupants": r"(regular\s*building\s*occupants|people|residents)\s*=\s*(\d+)",
+    "occupantss": r"(|people|residents)\s*=\s*(\d+)",
+    "dwelling_units": r"number\s*of\s*dwelling\s*units\s*=\s*(\d+)",
+    "peak_visitors": r"peak\svisitors\s*=\s*([\d.]+)",
+    "peak_inpatients": r"peak\sinpatients\s*=\s*([\d.]+)",
+    "qualifying_outpatients": r"qualifying\soutpatients\s*=\s*([\d.]+)",
+    "unit": r"(foot|ft|feet|foot2|ft2|feet2|m|meter|meter2|m2)",
+    "area": r"(?:floor\s*area|building\s*area|area)\s*=\s*([\d.]+)\s*(foot|ft|foot2|ft2|meter|m|meter2|m2)?",
+    "areaa": r"(?:floor\s*area|building\s*area|area)\s*=\s*([\d.]+)\s*([a-zA-Z]+)?",
+    "length_width": (
+            r"(?:(?:length\s*=\s*(?P<length>[\d.]+)\s*(?P<length_unit>foot|ft|meter|m))\s*(?:,|and)?\s*"
+            r"(?:width\s*=\s*(?P<width>[\d.]+)\s*(?P<width_unit>foot|ft|meter|m))|"
+            r"(?:width\s*=\s*(?P<width2>[\d.]+)\s*(?P<width_unit2>foot|ft|meter|m))\s*(?:,|and)?\s*"
+            r"(?:length\s*=\s*(?P<length2>[\d.]+)\s*(?P<length_unit2>foot|ft|meter|m)))"
+                    ),
+
+    "length_widthh": (
+            r"(?:length\s*=\s*(?P<length>[\d.]+)\s*(?P<length_unit>foot|ft|meter|m)\s*(?:,|and)?\s*"
+            r"width\s*=\s*(?P<width>[\d.]+)\s*(?P<width_unit>foot|ft|meter|m))|"
+            r"(?:width\s*=\s*(?P<width2>[\d.]+)\s*(?P<width_unit2>foot|ft|meter|m)\s*(?:,|and)?\s*"
+            r"length\s*=\s*(?P<length2>[\d.]+)\s*(?P<length_unit2>foot|ft|meter|m))"
+                         ),
+    "area_with_unit": r"(?:area\s*=\s*([\d.]+)\s*(foot|ft|foot2|ft2|meter|m|meter2|m2))",
+    "total_parking_space": r"(Total\s*parking\s*space|Total\s*space|Total\s*spaces|Total\s*parking\s*spaces)\s*=\s*(\d+)",
+    "restoration_area": r"Restoration\s*area\s*=\s*([\d.]+)",
+    "disturbed_area": r"Total\s*previously\s*disturbed\s*site\s*area\s*=\s*([\d.]+)",
+    "total_site_area": r"Total\s*site\s*area\s*=\s*([\d.]+)",
+    "required_open_space": r"(required\s*open\s*space|open\s*space)\s*=\s*([\d.]+)",
+    "rainfall" : r"rainfall\s*=\s*([\d.]+)",
+    "depression_storage" : r"depression\s*storage\s*=\s*([\d.]+)?",
+    "infiltration" : r"infiltration\s*=\s*([\d.]+)",
+    "fmin": r"fmin\s*=\s*([\d.]+)",
+    "fmax": r"fmax\s*=\s*([\d.]+)",
+    "k": r"k\s*=\s*([\d.]+)",
+    "t": r"t\s*=\s*([\d.]+)",
+    "previously_area": r"Area\s*of\s*previously\s*developed\s*land\s*=\s*([\d.]+)",
+    "development_footprint": r"development\s*footprint\s*=\s*([\d.]+)",
+    "long_term": r"long\s*term\s*=\s*([\d]+)",
+    "short_term": r"short\s*term\s*=\s*([\d]+)",
+    "area_racks": r"(area|floor|building)\s*=\s*([\d.]+)",
+    "baseline_energy": r"(?i)\b(?:baseline\s+(?:annual\s+)?energy)\s*=\s*([\d.]+)",
+    "proposed_energy": r"(?i)\b(?:proposed\s+(?:annual\s+)?energy)\s*=\s*([\d.]+)",
+    "material_thickness": r"material\s*thickness\s*=\s*([\d.]+)",
+    "thermal_conductivity": r"thermal\s*conductivity\s*=\s*([\d.]+)",
+    "R_value": r"(?i)r\s*value\s*=\s*([\d.]+)",
+    "shw_generated": r"annual\s*hot\s*water\s*generated\s*by\s*shw\s*=\s*([\d.]+)",
+    "hot_water_demand": r"annual\s*hot\s*water\s*demand\s*=\s*([\d.]+)",
+    "pv_energy_generated": r"energy\s*generated\s*by\s*pv\s*=\s*([\d.]+)",
+    "proposed_energy_consumption": r"proposed\s*annual\s*energy\s*consumption\s*=\s*([\d.]+)",
+    "annual_energy_generated": r"annual\s*energy\s*generated\s*=\s*([\d.]+)",
+    "community_energy_consumed": r"community\s*energy\s*consumption\s*=\s*([\d.]+)",
+    "designed_occupancy": r"designed\s*maximum\s*occupancy\s*=\s*(\d+)",
+    "expected_occupancy": r"expected\s*occupancy\s*=\s*(\d+)",
+    "total_occupancy": r"total\s*occupancy\s*=\s*(\d+)",
+    "compliant_adhesives": r"weight\s*of\s*adhesives\s*and\s*sealants\s*not\s*exceeding\s*voc\s*=\s*([\d.]+)",
+    "total_adhesives": r"total\s*weight\s*=\s*([\d.]+)",
+    "recycled": r"(amount\s*of\s*recycled|recycled)\s*=\s*([\d.]+)",
+    "reused": r"(amount\s*of\s*reused|reused)\s*=\s*([\d.]+)",
+    "salvaged": r"(amount\s*of\s*salvaged|salvaged)\s*=\s*([\d.]+)",
+    "donated": r"(amount\s*of\s*donated|donated)\s*=\s*([\d.]+)",
+    "reclaimed": r"(amount\s*of\s*reclaimed|reclaimed)\s*=\s*([\d.]+)",
+    "total_waste": r"(total\s*amount\s*of\s*waste\s*generated|total\s*waste)\s*=\s*([\d.]+)",
+    "street_links": r"street\s*links\s*=\s*(\d+)",
+    "nodes": r"nodes\s*=\s*(\d+)",
+    "intersections": r"intersections\s*=\s*(\d+)",
+    "continuous_walkway_on_both": r"linear\s*length\s*on\s*both\s*sides\s*=\s*([\d.]+)",
+    "all_walkways": r"all\s*walkways\s*=\s*([\d.]+)",
+    "gfa": r"(gross\s*(floor\s*)?area|gfa)\s*=\s*([\d.]+)",
+    "site_area": r"total\s*site\s*area\s*=\s*([\d.]+)",
+    "cooling_provided":r"cooling\s*provided\s*=\s*([\d.]+)",
+    "energy_consumed" : r"energy\s*consumed\s*=\s*([\d.]+)",
+    "compliant_paints":r"weight\s*not\s*exceeding\s*voc\s*=\s*([\d.]+)",
+    "total_paints":r"total\s*weight\s*=\s*([\d.]+)",
+    "Dwelling_building_size": r"(communal|private)"
+})
+
+# Label spellings of every "<label> = <value>" pattern in PATTERNS, used by the
+# single-pass scanner. Words are joined the way the regex joins them: " " for \s*,
+# "+" for \s+ and "_" for exactly one \s. An empty label matches the bare "=".
+LABELS = {
+    "occupants": ("regular building occupants", "people", "residents"),
+    "occupantss": ("people", "residents", ""),
+    "dwelling_units": ("number of dwelling units",),
+    "peak_visitors": ("peak_visitors",),
+    "peak_inpatients": ("peak_inpatients",),
+    "qualifying_outpatients": ("qualifying_outpatients",),
+    "area": ("floor area", "building area", "area"),
+    "areaa": ("floor area", "building area", "area"),
+    "length_width": ("length", "width"),
+    "length_widthh": ("length", "width"),
+    "area_with_unit": ("area",),
+    "total_parking_space": ("total parking space", "total space", "total spaces", "total parking spaces"),
+    "restoration_area": ("restoration area",),
+    "disturbed_area": ("total previously disturbed site area",),
+    "total_site_area": ("total site area",),
+    "required_open_space": ("required open space", "open space"),
+    "rainfall": ("rainfall",),
+    "depression_storage": ("depression storage",),
+    "infiltration": ("infiltration",),
+    "fmin": ("fmin",),
+    "fmax": ("fmax",),
+    "k": ("k",),
+    "t": ("t",),
+    "previously_area": ("area of previously developed land",),
+    "development_footprint": ("development footprint",),
+    "long_term": ("long term",),
+    "short_term": ("short term",),
+    "area_racks": ("area", "floor", "building"),
+    "baseline_energy": ("baseline+energy", "baseline+annual+energy"),
+    "proposed_energy": ("proposed+energy", "proposed+annual+energy"),
+    "material_thickness": ("material thickness",),
+    "thermal_conductivity": ("thermal conductivity",),
+    "R_value": ("r value",),
+    "shw_generated": ("annual hot water generated by shw",),
+    "hot_water_demand": ("annual hot water demand",),
+    "pv_energy_generated": ("energy generated by pv",),
+    "proposed_energy_consumption": ("proposed annual energy consumption",),
+    "annual_energy_generated": ("annual energy generated",),
+    "community_energy_consumed": ("community energy consumption",),
+    "designed_occupancy": ("designed maximum occupancy",),
+    "expected_occupancy": ("expected occupancy",),
+    "total_occupancy": ("total occupancy",),
+    "compliant_adhesives": ("weight of adhesives and sealants not exceeding voc",),
+    "total_adhesives": ("total weight",),
+    "recycled": ("amount of recycled", "recycled"),
+    "reused": ("amount of reused", "reused"),
+    "salvaged": ("amount of salvaged", "salvaged"),
+    "donated": ("amount of donated", "donated"),
+    "reclaimed": ("amount of reclaimed", "reclaimed"),
+    "total_waste": ("total amount of waste generated", "total waste"),
+    "street_links": ("street links",),
+    "nodes": ("nodes",),
+    "intersections": ("intersections",),
+    "continuous_walkway_on_both": ("linear length on both sides",),
+    "all_walkways": ("all walkways",),
+    "gfa": ("gross floor area", "gross area", "gfa"),
+    "site_area": ("total site area",),
+    "cooling_provided": ("cooling provided",),
+    "energy_consumed": ("energy consumed",),
+    "compliant_paints": ("weight not exceeding voc",),
+    "total_paints": ("total weight",),
+}
+
+class _LabelNode:
+    __slots__ = ("chars", "gaps", "keys")
+
+    def __init__(self):
+        self.chars = {}
+        self.gaps = {}
+        self.keys = []
+
+class KeyValueScanner:
+    """Extract every catalog pattern in one pass over the text.
+
+    Each "=" in the text is visited once, left to right. The label in front of it
+    is matched backwards against a trie of all LABELS, and only the keys whose
+    label ends there are confirmed with an anchored match of their compiled
+    pattern, which yields exactly the groups re.search would have returned.
+    Patterns without an "=" (building type, units, ...) are searched directly.
+    """
+    # Characters IGNORECASE treats as ASCII letters even after lower()
+    _FOLD = {"ı": "i", "ſ": "s"}
+    _GAPS = {" ": "*", "+": "+", "_": "1"}
+
+    def __init__(self, patterns, labels):
+        self.patterns = patterns
+        self.free_keys = [key for key in patterns if key not in labels]
+        self.root = _LabelNode()
+        for key, variants in labels.items():
+            for variant in variants:
+                self._add(key, variant)
+
+    def _add(self, key, variant):
+        node = self.root
+        for token in reversed(re.split(r"([ +_])", variant)):
+            if token in self._GAPS:
+                node = node.gaps.setdefault(self._GAPS[token], _LabelNode())
+            else:
+                for char in reversed(token):
+                    node = node.chars.setdefault(char, _LabelNode())
+        if key not in node.keys:
+            node.keys.append(key)
+
+    def _label_starts(self, text, end):
+        """Return (start, keys) for every label that ends at position end."""
+        found = []
+        stack = [(end, self.root)]
+        while stack:
+            pos, node = stack.pop()
+            if node.keys:
+                found.append((pos, node.keys))
+            if pos:
+                char = text[pos - 1]
+                child = node.chars.get(self._FOLD.get(char, char))
+                if child is not None:
+                    stack.append((pos - 1, child))
+            if node.gaps:
+                start = pos
+                while start and text[start - 1].isspace():
+                    start -= 1
+                width = pos - start
+                for kind, child in node.gaps.items():
+                    if kind == "*" or (kind == "+" and width) or (kind == "1" and width == 1):
+                        stack.append((start, child))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def scan(self, text: str, keys=None):
+        """Return {key: match.groups()} for the first match of each pattern.
+
+        When keys is given only those patterns are evaluated, and the scan stops
+        as soon as all of them have matched.
+        """
+        matches = {}
+        if keys is None:
+            free_keys, pending = self.free_keys, None
+        else:
+            free_keys = [key for key in self.free_keys if key in keys]
+            pending = {key for key in keys if key not in free_keys}
+        for key in free_keys:
+            match = self.patterns[key].search(text)
+            if match:
+                matches[key] = match.groups()
+        equals = text.find("=") if pending is None or pending else -1
+        while equals != -1:
+            end = equals
+            while end and text[end - 1].isspace():
+                end -= 1
+            for start, label_keys in self._label_starts(text, end):
+                for key in label_keys:
+                    if key not in matches and (pending is None or key in pending):
+                        match = self.patterns[key].match(text, start)
+                        if match:
+                            matches[key] = match.groups()
+                            if pending is not None:
+                                pending.discard(key)
+            if pending is not None and not pending:
+                break
+            equals = text.find("=", equals + 1)
+        return matches
+
+SCANNER = KeyValueScanner(PATTERNS, LABELS)
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton that finds every phrase label in one pass over a text.
+
+    The failure links are folded into a complete transition table at build time,
+    so scanning costs one dict lookup per character however many phrases exist.
+    """
+
+    def __init__(self, phrases):
+        self.priority = {label: rank for rank, label in enumerate(phrases)}
+        goto = [{}]
+        outputs = [set()]
+        for label, variants in phrases.items():
+            for phrase in variants:
+                state = 0
+                for char in phrase:
+                    if char not in goto[state]:
+                        goto.append({})
+                        outputs.append(set())
+                        goto[state][char] = len(goto) - 1
+                    state = goto[state][char]
+                outputs[state].add(label)
+
+        # Breadth-first pass: inherit outputs and missing transitions from the failure state
+        self.transitions = [dict(goto[0])]
+        self.transitions.extend({} for _ in goto[1:])
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            row = self.transitions[state]
+            row.update(self.transitions[fail[state]])
+            row.update(goto[state])
+            for char, child in goto[state].items():
+                fail[child] = self.transitions[fail[state]].get(char, 0) if state else 0
+                outputs[child] |= outputs[fail[child]]
+                queue.append(child)
+        self.outputs = [frozenset(labels) for labels in outputs]
+
+    def find(self, text: str):
+        """Return the labels whose phrases occur in text, highest priority first."""
+        transitions, outputs = self.transitions, self.outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return sorted(found, key=self.priority.__getitem__)
+
+class LazyMatches:
+    """Per-message parameter store over the pattern catalog, the only reader of the text.
+
+    prefetch() resolves a group of fields in one scan; any other field is
+    searched on its own the first time it is read. Results, including misses,
+    are memoized for the lifetime of the message, and so are the numbers
+    parsed from them by number()/integer(). Keywords a calculator tests for
+    are looked up once at prefetch and read back with mentions(). Calculators
+    read everything from here and never search the text themselves.
+    """
+    __slots__ = ("text", "scanner", "_values", "_numbers", "_mentions")
+
+    def __init__(self, text: str, scanner=None):
+        self.text = text
+        self.scanner = scanner or SCANNER
+        self._values = {}
+        self._numbers = {}
+        self._mentions = {}
+
+    def prefetch(self, keys, keywords=()):
+        """Resolve the given fields together with a single scan of the text, and note which keywords occur."""
+        missing = [key for key in keys if key not in self._values]
+        if missing:
+            found = self.scanner.scan(self.text, missing)
+            for key in missing:
+                self._values[key] = found.get(key)
+        for keyword in keywords:
+            self._mentions[keyword] = keyword in self.text
+
+    def mentions(self, keyword: str):
+        """Whether keyword occurs in the text; it must have been passed to prefetch()."""
+        return self._mentions[keyword]
+
+    def number(self, key: str, *indices, convert=float):
+        """Parse a group of key with convert (float by default), once per message.
+
+        With several indices the first non-empty group is used, like
+        groups[i] or groups[j]. A group that does not parse raises the same
+        ValueError or TypeError as calling convert on it would, on every read.
+        """
+        memo = (key, indices, convert)
+        value = self._numbers.get(memo, _MISSING)
+        if value is _MISSING:
+            groups = self.get(key)
+            text = None
+            if groups is not None:
+                for index in indices or (0,):
+                    text = groups[index]
+                    if text:
+                        break
+            try:
+                value = convert(text)
+            except (TypeError, ValueError) as e:
+                value = e
+            self._numbers[memo] = value
+        if isinstance(value, Exception):
+            raise type(value)(*value.args)
+        return value
+
+    def integer(self, key: str, *indices):
+        """Like number(), parsing with int()."""
+        return self.number(key, *indices, convert=int)
+
+    def get(self, key, default=None):
+        if key not in self._values:
+            match = self.scanner.patterns[key].search(self.text)
+            self._values[key] = match.groups() if match else None
+        value = self._values[key]
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def items(self):
+        """Fields extracted so far that matched."""
+        return [(key, value) for key, value in self._values.items() if value is not None]
+
+_MISSING = object()
+
+class SharedGeneration:
+    """An invalidation marker in a small file, so every process on a node sees a cache flush.
+
+    bump() writes a fresh random marker. current() rereads the file at most
+    once per check_interval seconds, so other processes (pool workers, other
+    uvicorn workers) drop their entries within that time.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._value = None
+        self._checked = float("-inf")
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            try:
+                with open(self.path, encoding="ascii") as f:
+                    self._value = f.read().strip()
+            except OSError:
+                self._value = None  # never invalidated
+            self._checked = now
+        return self._value
+
+    def bump(self):
+        value = os.urandom(8).hex()
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="ascii") as f:
+            f.write(value)
+        os.replace(temporary, self.path)
+        self._value, self._checked = value, time.monotonic()
+        return value
+
+class ResultCache:
+    """Size-bounded LRU cache of calculator results with a time-to-live.
+
+    Keys are built from the chosen intent and the parameters its calculator
+    reads, not from the raw message, so rewordings and reorderings of the same
+    query share an entry. Each process has its own cache; an optional store
+    (see SQLiteResultStore) is consulted on a miss and shared between them.
+    An optional SharedGeneration carries invalidate() to the other processes.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0, store=None, generation=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self.generation = generation
+        self._seen_generation = generation.current() if generation is not None else None
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _sync(self):
+        """Drop this process's entries once another process has invalidated the cache."""
+        current = self.generation.current()
+        if current != self._seen_generation:
+            with self._lock:
+                self._entries.clear()
+            self._seen_generation = current
+
+    def get(self, key, default=None):
+        if self.generation is not None:
+            self._sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+        if self.store is not None:
+            result = self.store.get(key, _MISSING)
+            if result is not _MISSING:
+                self._remember(key, result)
+                with self._lock:
+                    self.store_hits += 1
+                return result
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _remember(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if self.store is not None:
+            self.store.put(key, result)
+
+    def invalidate(self):
+        """Drop every entry, e.g. after a formula change, here and in the processes sharing the generation."""
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self.store.clear()
+        if self.generation is not None:
+            self._seen_generation = self.generation.bump()
+
+    def stats(self, store: bool = False):
+        """Counters of this process's cache; store=True adds the shared store's, which reads its file."""
+        lookups = self.hits + self.store_hits + self.misses
+        stats = {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.store_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+        if store and self.store is not None:
+            stats["store"] = self.store.stats()
+        return stats
+
+class SQLiteResultStore:
+    """Results in a SQLite file, shared by every worker on a node and kept across restarts.
+
+    Rows are tagged with version, a digest of the calculator code, so a deploy
+    that changes any formula, pattern or label starts from an empty store and
+    rows from other versions are removed on open. Beyond max_rows the oldest
+    rows are pruned. Lookups never write, so readers do not contend for the
+    file lock. Storage errors are logged and treated as misses.
+    """
+    PRUNE_EVERY = 64
+
+    def __init__(self, path: str, version: str, max_rows: int = 100000, ttl: float = 86400.0):
+        self.path = path
+        self.version = version
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.errors = 0
+        self._puts = 0
+        self._local = threading.local()
+        connection = self._connect()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, version TEXT, result TEXT, created REAL, expires REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+        connection.execute("DELETE FROM results WHERE version != ? OR expires < ?", (version, time.time()))
+
+    def _connect(self):
+        # Connections are per thread and must not cross a fork into a worker process
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _row_key(self, key):
+        return json.dumps([self.version, key], separators=(",", ":"))
+
+    def get(self, key, default=None):
+        try:
+            row = self._connect().execute(
+                "SELECT result FROM results WHERE key = ? AND expires > ?", (self._row_key(key), time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Result store lookup failed: {e}")
+            return default
+        return default if row is None else json.loads(row[0])
+
+    def put(self, key, result):
+        now = time.time()
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, version, result, created, expires) VALUES (?, ?, ?, ?, ?)",
+                (self._row_key(key), self.version, json.dumps(result), now, now + self.ttl),
+            )
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                self.prune(connection)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Result store write failed: {e}")
+
+    def prune(self, connection=None):
+        """Remove expired rows and the oldest rows beyond max_rows."""
+        connection = connection or self._connect()
+        connection.execute("DELETE FROM results WHERE expires < ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM results WHERE rowid IN "
+            "(SELECT rowid FROM results ORDER BY created LIMIT max(0, (SELECT COUNT(*) FROM results) - ?))",
+            (self.max_rows,),
+        )
+
+    def clear(self):
+        try:
+            self._connect().execute("DELETE FROM results")
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Result store clear failed: {e}")
+
+    def stats(self):
+        try:
+            rows = self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        except sqlite3.Error:
+            rows = None
+        return {"version": self.version, "rows": rows, "max_rows": self.max_rows, "errors": self.errors}
+
+Calculator = namedtuple("Calculator", ["intent", "priority", "phrases", "fields", "keywords", "handler"])
+
+# Registered calculators keyed by intent; filled by the @calculator decorator below.
+CALCULATORS = {}
+
+def calculator(intent, priority, phrases, fields=(), keywords=()):
+    """Register a process_* method as the calculator for an intent.
+
+    phrases trigger the intent, fields are the catalog keys the method reads,
+    and keywords are any substrings it tests on the raw text. When several
+    intents are detected the lowest priority number wins.
+    """
+    def register(handler):
+        if intent in CALCULATORS:
+            raise ValueError(f"Calculator for intent '{intent}' is already registered")
+        CALCULATORS[intent] = Calculator(intent, priority, tuple(phrases), tuple(fields), tuple(keywords), handler)
+        return handler
+    return register
 
 class BuildingDataProcessor:
-    def __init__(self, input_text: str):
+    patterns = PATTERNS
+
+    def __init__(self, input_text: str = ""):
+        self.load(input_text)
+
+    def load(self, input_text: str, intent: str = None):
+        """Reset the per-message state and parse a new input text.
+
+        intent, when given, is used in place of the highest-priority detected one.
+        """
         self.input_text = input_text.lower()
-        self.patterns = {
-            "building_type": r"(commercial|institutional|residential|retail)",
-            "building_typee": r"(multi-residential|individual)",
-            "occupants": r"(regular\s*building\s*occupants|people|residents)\s*=\s*(\d+)",
-            "occupantss": r"(|people|residents)\s*=\s*(\d+)",
-            "dwelling_units": r"number\s*of\s*dwelling\s*units\s*=\s*(\d+)",
-            "peak_visitors": r"peak\svisitors\s*=\s*([\d.]+)",
-            "peak_inpatients": r"peak\sinpatients\s*=\s*([\d.]+)",
-            "qualifying_outpatients": r"qualifying\soutpatients\s*=\s*([\d.]+)",
-            "unit": r"(foot|ft|feet|foot2|ft2|feet2|m|meter|meter2|m2)",
-            "area": r"(?:floor\s*area|building\s*area|area)\s*=\s*([\d.]+)\s*(foot|ft|foot2|ft2|meter|m|meter2|m2)?",
-            "areaa": r"(?:floor\s*area|building\s*area|area)\s*=\s*([\d.]+)\s*([a-zA-Z]+)?",
-            "length_width": (
-                    r"(?:(?:length\s*=\s*(?P<length>[\d.]+)\s*(?P<length_unit>foot|ft|meter|m))\s*(?:,|and)?\s*"
-                    r"(?:width\s*=\s*(?P<width>[\d.]+)\s*(?P<width_unit>foot|ft|meter|m))|"
-                    r"(?:width\s*=\s*(?P<width2>[\d.]+)\s*(?P<width_unit2>foot|ft|meter|m))\s*(?:,|and)?\s*"
-                    r"(?:length\s*=\s*(?P<length2>[\d.]+)\s*(?P<length_unit2>foot|ft|meter|m)))"
-                            ),
-
-            "length_widthh": (
-                    r"(?:length\s*=\s*(?P<length>[\d.]+)\s*(?P<length_unit>foot|ft|meter|m)\s*(?:,|and)?\s*"
-                    r"width\s*=\s*(?P<width>[\d.]+)\s*(?P<width_unit>foot|ft|meter|m))|"
-                    r"(?:width\s*=\s*(?P<width2>[\d.]+)\s*(?P<width_unit2>foot|ft|meter|m)\s*(?:,|and)?\s*"
-                    r"length\s*=\s*(?P<length2>[\d.]+)\s*(?P<length_unit2>foot|ft|meter|m))"
-                                 ),
-            "area_with_unit": r"(?:area\s*=\s*([\d.]+)\s*(foot|ft|foot2|ft2|meter|m|meter2|m2))",
-            "total_parking_space": r"(Total\s*parking\s*space|Total\s*space|Total\s*spaces|Total\s*parking\s*spaces)\s*=\s*(\d+)",
-            "restoration_area": r"Restoration\s*area\s*=\s*([\d.]+)",
-            "disturbed_area": r"Total\s*previously\s*disturbed\s*site\s*area\s*=\s*([\d.]+)",
-            "total_site_area": r"Total\s*site\s*area\s*=\s*([\d.]+)",
-            "required_open_space": r"(required\s*open\s*space|open\s*space)\s*=\s*([\d.]+)",
-            "rainfall" : r"rainfall\s*=\s*([\d.]+)",
-            "depression_storage" : r"depression\s*storage\s*=\s*([\d.]+)?",
-            "infiltration" : r"infiltration\s*=\s*([\d.]+)",
-            "fmin": r"fmin\s*=\s*([\d.]+)",
-            "fmax": r"fmax\s*=\s*([\d.]+)",
-            "k": r"k\s*=\s*([\d.]+)",
-            "t": r"t\s*=\s*([\d.]+)",
-            "previously_area": r"Area\s*of\s*previously\s*developed\s*land\s*=\s*([\d.]+)",
-            "development_footprint": r"development\s*footprint\s*=\s*([\d.]+)",
-            "long_term": r"long\s*term\s*=\s*([\d]+)",
-            "short_term": r"short\s*term\s*=\s*([\d]+)",
-            "area_racks": r"(area|floor|building)\s*=\s*([\d.]+)",
-            "baseline_energy": r"(?i)\b(?:baseline\s+(?:annual\s+)?energy)\s*=\s*([\d.]+)",
-            "proposed_energy": r"(?i)\b(?:proposed\s+(?:annual\s+)?energy)\s*=\s*([\d.]+)",
-            "material_thickness": r"material\s*thickness\s*=\s*([\d.]+)",
-            "thermal_conductivity": r"thermal\s*conductivity\s*=\s*([\d.]+)",
-            "R_value": r"(?i)r\s*value\s*=\s*([\d.]+)",
-            "shw_generated": r"annual\s*hot\s*water\s*generated\s*by\s*shw\s*=\s*([\d.]+)",
-            "hot_water_demand": r"annual\s*hot\s*water\s*demand\s*=\s*([\d.]+)",
-            "pv_energy_generated": r"energy\s*generated\s*by\s*pv\s*=\s*([\d.]+)",
-            "proposed_energy_consumption": r"proposed\s*annual\s*energy\s*consumption\s*=\s*([\d.]+)",
-            "annual_energy_generated": r"annual\s*energy\s*generated\s*=\s*([\d.]+)",
-            "community_energy_consumed": r"community\s*energy\s*consumption\s*=\s*([\d.]+)",
-            "designed_occupancy": r"designed\s*maximum\s*occupancy\s*=\s*(\d+)",
-            "expected_occupancy": r"expected\s*occupancy\s*=\s*(\d+)",
-            "total_occupancy": r"total\s*occupancy\s*=\s*(\d+)",
-            "compliant_adhesives": r"weight\s*of\s*adhesives\s*and\s*sealants\s*not\s*exceeding\s*voc\s*=\s*([\d.]+)",
-            "total_adhesives": r"total\s*weight\s*=\s*([\d.]+)",
-            "recycled": r"(amount\s*of\s*recycled|recycled)\s*=\s*([\d.]+)",
-            "reused": r"(amount\s*of\s*reused|reused)\s*=\s*([\d.]+)",
-            "salvaged": r"(amount\s*of\s*salvaged|salvaged)\s*=\s*([\d.]+)",
-            "donated": r"(amount\s*of\s*donated|donated)\s*=\s*([\d.]+)",
-            "reclaimed": r"(amount\s*of\s*reclaimed|reclaimed)\s*=\s*([\d.]+)",
-            "total_waste": r"(total\s*amount\s*of\s*waste\s*generated|total\s*waste)\s*=\s*([\d.]+)",
-            "street_links": r"street\s*links\s*=\s*(\d+)",
-            "nodes": r"nodes\s*=\s*(\d+)",
-            "intersections": r"intersections\s*=\s*(\d+)",
-            "continuous_walkway_on_both": r"linear\s*length\s*on\s*both\s*sides\s*=\s*([\d.]+)",
-            "all_walkways": r"all\s*walkways\s*=\s*([\d.]+)",
-            "gfa": r"(gross\s*(floor\s*)?area|gfa)\s*=\s*([\d.]+)",
-            "site_area": r"total\s*site\s*area\s*=\s*([\d.]+)",
-            "cooling_provided":r"cooling\s*provided\s*=\s*([\d.]+)",
-            "energy_consumed" : r"energy\s*consumed\s*=\s*([\d.]+)",
-            "compliant_paints":r"weight\s*not\s*exceeding\s*voc\s*=\s*([\d.]+)",
-            "total_paints":r"total\s*weight\s*=\s*([\d.]+)",
-            "Dwelling_building_size": r"(communal|private)"
-        }
-        self.matches = {}
-        self.intents = {}
-        self.extract_data()
+        self.outcome = None
+        self.started_at = started = time.perf_counter()
         self.detect_intents()
+        if intent is not None:
+            if intent not in CALCULATORS:
+                raise ValueError(f"Unknown intent '{intent}'")
+            self.detected_intents = [intent] + [other for other in self.detected_intents if other != intent]
+            self.intents[intent] = True
+        if _profiler is not None:
+            intent = self.primary_intent()
+            _profiler.begin(CALCULATORS[intent].handler.__name__ if intent is not None else None)
+        detected = time.perf_counter()
+        self.extract_data()
+        self.timings = {"detect_intents": detected - started, "extract_data": time.perf_counter() - detected}
+
+    def primary_intent(self):
+        """Return the intent process() will dispatch to, or None."""
+        return self.detected_intents[0] if self.detected_intents else None
 
     def extract_data(self):
-        """Extract data based on regex patterns."""
-        for key, pattern in self.patterns.items():
-            match = re.search(pattern, self.input_text, re.IGNORECASE)
-            if match:
-                self.matches[key] = match.groups()
-                logging.debug(f"Match for {key}: {self.matches[key]}")  # Log the matches for debugging purposes
+        """Extract the fields the detected calculator needs; others load lazily on access."""
+        self.matches = LazyMatches(self.input_text)
+        intent = self.primary_intent()
+        if intent is not None:
+            calc = CALCULATORS[intent]
+            self.matches.prefetch(calc.fields, calc.keywords)
+        if logger.isEnabledFor(logging.DEBUG):
+            for key, groups in self.matches.items():
+                logger.debug("Match for %s: %s", key, groups)  # Log the matches for debugging purposes
 
     def detect_intents(self):
-        """Detect intents from the input text."""
-        self.intents['long_term_storage'] = "long-term bicycle storage" in self.input_text
-        self.intents['short_term_storage'] = "short-term bicycle storage" in self.input_text
-        self.intents['shower_facilities'] = any(phrase in self.input_text.lower() for phrase in ["shower facilities", "shower", "shower facility"])
-        self.intents['preferred_spaces'] = any(phrase in self.input_text.lower() for phrase in ["preferred space", "preferred spaces", "required number of preferred spaces"])
-        self.intents['fueling_stations'] = any(phrase in self.input_text.lower() for phrase in ["fueling stations", "fuel stations", "required number of fueling stations"])
-        self.intents['restoration_area'] = any(phrase in self.input_text.lower() for phrase in ["percentage of restoration area", "restoration area percentage"])
-        self.intents['open_space'] = any(phrase in self.input_text.lower() for phrase in ["required open space", "open space requirement"])
-        self.intents['vegetated_space'] = "vegetated space" in self.input_text
-        self.intents['outdoor_area'] = any(phrase in self.input_text.lower() for phrase in ["required outdoor area", "outdoor area requirement", "outdoor area"])
-        self.intents['air_volume_before_occupancy'] = any(phrase in self.input_text.lower() for phrase in ["air volume before occupancy", "flush out before occupancy"])
-        self.intents['air_volume_during_occupancy'] = any(phrase in self.input_text.lower() for phrase in ["air volume during occupancy", "flush out during occupancy"])
-        self.intents['air_volume_to_complete'] = any(phrase in self.input_text.lower() for phrase in ["air volume to complete", "flush out to complete"])
-        self.intents['Runoff'] = any(phrase in self.input_text.lower() for phrase in ["runoff", "Expected runoff","run off"])
-        self.intents['Depression storage'] = "depression storage" in self.input_text.lower()
-        self.intents['development_percentage'] = any(phrase in self.input_text.lower() for phrase in ["previously developed land", "percentage of previously developed land"]) 
-        self.intents['bicycle_racks'] = any(phrase in self.input_text for phrase in ["number of bicycle racks required", "total of bicycle racks", "bicycle racks"])
-        self.intents['energy_performance'] = any(phrase in self.input_text for phrase in ["energy performance", "energy improvement"])
-        self.intents['r_value'] = any(phrase in self.input_text for phrase in ["r-value", "r value"])
-        self.intents['u_value'] = any(phrase in self.input_text for phrase in ["u-value", "u value"])
-        self.intents['shw'] = "hot water demand provided by shw" in self.input_text
-        self.intents['renewable_energy'] = "renewable energy" in self.input_text
-        self.intents['occupant_density'] = "occupant density" in self.input_text
-        self.intents['size_of_outdoor_space'] = "size of outdoor space" in self.input_text
-        self.intents['adhesives_sealants_intent'] = "compliant adhesives and sealants" in self.input_text
-        self.intents['waste_diverted_intent'] = "waste diverted from landfill" in self.input_text
-        self.intents['connectivity_index_intent'] = "connectivity index" in self.input_text
-        self.intents['intersection_density_intent'] = "intersection density" in self.input_text
-        self.intents['continuous_walkway_intent'] = any(phrase in self.input_text for phrase in ["continuous walkway", "cw"])
-        self.intents['far']=any(phrase in self.input_text.lower() for phrase in["floor area ratio","far"])
-        self.intents['seer']="seer" in self.input_text.lower()
-        self.intents['compliant_paints']=any(phrase in self.input_text.lower() for phrase in ["compliant paints and coating", "compliant paints and coatings"])
-        self.intents['dwelling_building_size'] = any(phrase in self.input_text for phrase in ["dwelling size","building size"])
-        
+        """Detect intents from the input text in a single pass of the phrase automaton."""
+        self.detected_intents = INTENTS.find(self.input_text)
+        self.intents = dict.fromkeys(CALCULATORS, False)
+        for intent in self.detected_intents:
+            self.intents[intent] = True
+
+    @calculator("long_term_storage", priority=1,
+                phrases=("long-term bicycle storage",),
+                fields=("building_type", "occupants", "dwelling_units"))
     def process_long_term_storage(self):
         """Process long-term bicycle storage calculations."""
         building_type_match = self.matches.get('building_type')
@@ -148,29 +708,33 @@ class BuildingDataProcessor:
         try:
             if building_type == 'residential':
                 if occupants_match and dwelling_units_match:
-                    regular_occupants = float(occupants_match[1])
-                    dwelling_units = float(dwelling_units_match[0])
+                    regular_occupants = self.matches.number('occupants', 1)
+                    dwelling_units = self.matches.number('dwelling_units', 0)
                     bikes_required = max(math.ceil(regular_occupants * 0.30), math.ceil(dwelling_units))
                     return f"{bikes_required} Bicycles required for long-term storage (residential)"
                 elif occupants_match:
-                    regular_occupants = float(occupants_match[1])
+                    regular_occupants = self.matches.number('occupants', 1)
                     bikes_required = math.ceil(regular_occupants * 0.30)
                     return f"{bikes_required} Bicycles required for long-term storage (residential)"
                 elif dwelling_units_match:
-                    dwelling_units = float(dwelling_units_match[0])
+                    dwelling_units = self.matches.number('dwelling_units', 0)
                     bikes_required = math.ceil(dwelling_units)
                     return f"{bikes_required} Bicycles required for long-term storage (residential)"
                 else:
                     return "Please specify 'Regular Building occupants' or 'number of dwelling units' for residential buildings."
             elif building_type in ['commercial', 'institutional']:
                 if occupants_match:
-                    regular_occupants = float(occupants_match[1])
+                    regular_occupants = self.matches.number('occupants', 1)
                     bikes_required = math.ceil(regular_occupants * 0.05)
                     return f"{bikes_required} Bicycles required for long-term storage ({building_type})"
         except ValueError:
-            logging.error("Error processing long-term storage")
+            logger.error("Error processing long-term storage")
             return "Invalid input for occupants or dwelling units."
 
+    @calculator("short_term_storage", priority=2,
+                phrases=("short-term bicycle storage",),
+                fields=("peak_visitors", "area", "length_width", "area_with_unit"),
+                keywords=("area", "length", "width"))
     def process_short_term_storage(self):
         """Process short-term bicycle storage calculations."""
         peak_visitors_match = self.matches.get('peak_visitors')
@@ -180,7 +744,7 @@ class BuildingDataProcessor:
         
         try:
             if peak_visitors_match:
-                peak_visitors = float(peak_visitors_match[0])
+                peak_visitors = self.matches.number('peak_visitors', 0)
                 bikes_required = math.ceil(peak_visitors * 0.025)
                 return f"{bikes_required} Bicycles required for short-term storage based on peak visitors"
         
@@ -195,32 +759,16 @@ class BuildingDataProcessor:
                 return self.process_short_term_storage_length_width()
             
             elif self.intents.get('short_term_storage'):
-                if "area" in self.input_text or "length" in self.input_text or "width" in self.input_text:
+                if self.matches.mentions("area") or self.matches.mentions("length") or self.matches.mentions("width"):
                     return "Specify the unit for required calculation"
-                elif not "area" in self.input_text or not "length" in self.input_text or not "width" in self.input_text:
+                elif not self.matches.mentions("area") or not self.matches.mentions("length") or not self.matches.mentions("width"):
                     return "Invalid input for peak visitors or area with unit or length and width with units"
             else:
                 raise ValueError("Invalid input for peak visitors or area with unit or length and width with units.")
         except ValueError as e:
-            logging.error(f"Error processing short-term storage: {e}")
+            logger.error(f"Error processing short-term storage: {e}")
             return str(e)  # Return the error message to the user
     
-    def process_preferred_spaces(self):
-        """Process the calculation of preferred parking spaces."""
-        preferred_spaces_match = self.matches.get('total_parking_space')
-        
-        try:
-            if preferred_spaces_match:
-                total_parking_spaces = float(preferred_spaces_match[1])  # Extract total parking spaces
-                preferred_spaces = math.ceil(total_parking_spaces * 0.05)  # Calculate 5% of total spaces
-                return f"{preferred_spaces} preferred parking spaces required"
-            else:
-                return "Invalid input for Preferred space. Please specify 'Total parking spaces = <number>'."
-        except ValueError:
-            logging.error("Value error in Total parking spaces calculation.")
-            return "Invalid input for Total parking spaces."
-
-            
     def process_short_term_storage_area(self):
         """Process short-term bicycle storage calculations based on area."""
     # Extract area and unit together
@@ -228,7 +776,7 @@ class BuildingDataProcessor:
 
         try:
             if area_unit_match:
-                area = float(area_unit_match[0])  # Extract area value
+                area = self.matches.number('area_with_unit', 0)  # Extract area value
                 unit = area_unit_match[1].lower() if area_unit_match[1] else None # Extract the matching unit from the text
             
             # If no unit is specified, return the error message
@@ -238,18 +786,18 @@ class BuildingDataProcessor:
             # Calculate based on the unit (foot or meter)
                 if unit in ['foot', 'ft', 'foot2', 'ft2']:
                     bikes_required = math.ceil(2 * (area / 5000))
-                    logging.debug(f"Calculation for feet: {area} {unit}, Result: {bikes_required}")
+                    logger.debug("Calculation for feet: %s %s, Result: %s", area, unit, bikes_required)
                     return f"{bikes_required} Bicycles required for short-term storage based on area"
                 elif unit in ['meter', 'm', 'meter2', 'm2']:
                     bikes_required = math.ceil(2 * (area / 465))
-                    logging.debug(f"Calculation for meters: {area} {unit}, Result: {bikes_required}")
+                    logger.debug("Calculation for meters: %s %s, Result: %s", area, unit, bikes_required)
                     return f"{bikes_required} Bicycles required for short-term storage based on area"
                 else:
                     raise ValueError("Invalid unit for area")
             else:
                 return "Specify the unit for required calculation"  # No area or unit found
         except ValueError as e:
-            logging.error(f"Error processing short-term storage: {e}")
+            logger.error(f"Error processing short-term storage: {e}")
             return str(e)  # Return the error message to the user
 
             
@@ -261,13 +809,13 @@ class BuildingDataProcessor:
             if length_width_match:
             # Extract length, width, and units from the match groups
                 if length_width_match[0] and length_width_match[2]:
-                    length = float(length_width_match[0])
-                    width = float(length_width_match[2])
+                    length = self.matches.number('length_width', 0)
+                    width = self.matches.number('length_width', 2)
                     length_unit = length_width_match[1].lower()
                     width_unit = length_width_match[3].lower()
                 elif length_width_match[6] and length_width_match[4]:
-                    length = float(length_width_match[6])
-                    width = float(length_width_match[4])
+                    length = self.matches.number('length_width', 6)
+                    width = self.matches.number('length_width', 4)
                     length_unit = length_width_match[5].lower()
                     width_unit = length_width_match[7].lower()
                 else:
@@ -293,16 +841,19 @@ class BuildingDataProcessor:
             else:
                 raise ValueError("Invalid input for length or width.")
         except ValueError as e:
-            logging.error(f"Error processing short-term storage: {e}")
+            logger.error(f"Error processing short-term storage: {e}")
             return str(e)  # Return the error message to the user
 
    
+    @calculator("shower_facilities", priority=3,
+                phrases=("shower facilities", "shower", "shower facility"),
+                fields=("occupants",))
     def process_shower_facilities(self):
         """Process shower facilities."""
         occupants_match = self.matches.get('occupants')
         try:
             if occupants_match:
-                regular_occupants = float(occupants_match[1])
+                regular_occupants = self.matches.number('occupants', 1)
                 if regular_occupants<=100:
                   showers_required = 1
         
@@ -314,39 +865,48 @@ class BuildingDataProcessor:
                 return "Invalid input for regular building occupants. Please specify a correct number."
         
         except ValueError:
-                logging.error("Value error in shower facilities calculation.")
+                logger.error("Value error in shower facilities calculation.")
                 return "Invalid input for regular building occupants. Please specify a correct number."
             
+    @calculator("preferred_spaces", priority=4,
+                phrases=("preferred space", "preferred spaces", "required number of preferred spaces"),
+                fields=("total_parking_space",))
     def process_preferred_spaces(self):
         """Process the calculation of preferred parking spaces."""
         preferred_spaces_match = self.matches.get('total_parking_space')
         
         try:
             if preferred_spaces_match:
-                total_parking_spaces = float(preferred_spaces_match[1])  # Extract total parking spaces
+                total_parking_spaces = self.matches.number('total_parking_space', 1)  # Extract total parking spaces
                 preferred_spaces = math.ceil(total_parking_spaces * 0.05)  # Calculate 5% of total spaces
                 return f"{preferred_spaces} preferred parking spaces required"
             else:
                 return "Invalid input for Preferred space. Please specify 'Total parking spaces = <number>'."
         except ValueError:
-            logging.error("Value error in Total parking spaces calculation.")
+            logger.error("Value error in Total parking spaces calculation.")
             return "Invalid input for Total parking spaces."
             
+    @calculator("fueling_stations", priority=5,
+                phrases=("fueling stations", "fuel stations", "required number of fueling stations"),
+                fields=("total_parking_space",))
     def process_fueling_stations(self):
         """Process the calculation of fueling stations."""
         fueling_stations_match = self.matches.get('total_parking_space')
 
         try:
             if fueling_stations_match:
-                total_parking_spaces = float(fueling_stations_match[1])  # Extract total parking spaces
+                total_parking_spaces = self.matches.number('total_parking_space', 1)  # Extract total parking spaces
                 fueling_stations = math.ceil(total_parking_spaces * 0.02)  # Calculate 2% of total spaces
                 return f"{fueling_stations} fueling stations required"
             else:
                 return "Invalid input for fueling stations. Please specify 'Total parking spaces = <number>'."
         except ValueError:
-            logging.error("Value error in Total parking spaces calculation for fueling stations.")
+            logger.error("Value error in Total parking spaces calculation for fueling stations.")
             return "Invalid input for Total parking spaces."
     
+    @calculator("restoration_area", priority=6,
+                phrases=("percentage of restoration area", "restoration area percentage"),
+                fields=("restoration_area", "disturbed_area"))
     def process_restoration_area(self):
         """Process the calculation for percentage of restoration area."""
         restoration_area_match = self.matches.get('restoration_area')
@@ -354,8 +914,8 @@ class BuildingDataProcessor:
 
         try:
             if restoration_area_match and disturbed_area_match:
-                restoration_area = float(restoration_area_match[0])  # Extract restoration area
-                disturbed_area = float(disturbed_area_match[0])  # Extract previously disturbed area
+                restoration_area = self.matches.number('restoration_area', 0)  # Extract restoration area
+                disturbed_area = self.matches.number('disturbed_area', 0)  # Extract previously disturbed area
                 
                 if disturbed_area == 0:
                     return "Total previously disturbed site area cannot be zero."
@@ -366,9 +926,12 @@ class BuildingDataProcessor:
             else:
                 return "Invalid input for restoration area. Please specify both 'Restoration area' and 'Total previously disturbed site area'."
         except ValueError:
-            logging.error("Value error in restoration area calculation.")
+            logger.error("Value error in restoration area calculation.")
             return "Invalid input for restoration area or previously disturbed site area."
 
+    @calculator("vegetated_space", priority=7,
+                phrases=("vegetated space",),
+                fields=("required_open_space", "total_site_area"))
     def process_vegetated_space(self):
         """Process the calculation for vegetated space."""
     # Try to match required open space directly from the input
@@ -377,7 +940,7 @@ class BuildingDataProcessor:
         try:
         # Case 1: If required open space is provided directly
             if required_open_space_match:
-                required_open_space = float(required_open_space_match[1])  # Extract required open space from match
+                required_open_space = self.matches.number('required_open_space', 1)  # Extract required open space from match
             else:
             # Case 2: Calculate required open space based on the total site area
                 required_open_space = self.process_required_open_space()
@@ -390,7 +953,7 @@ class BuildingDataProcessor:
                 return "Invalid input for vegetated space. Please specify 'Total site area' or 'Required open space'."
 
         except ValueError:
-            logging.error("Value error in vegetated space calculation.")
+            logger.error("Value error in vegetated space calculation.")
             return "Invalid input for vegetated space."
 
     def process_required_open_space(self):
@@ -399,15 +962,29 @@ class BuildingDataProcessor:
     
         try:
             if total_site_area_match:
-                total_site_area = float(total_site_area_match[0])  # Extract total site area
+                total_site_area = self.matches.number('total_site_area', 0)  # Extract total site area
                 required_open_space = math.ceil(total_site_area * 0.30)  # Calculate 30% of total site area
                 return required_open_space
             else:
                 return None  # No input for total site area
         except ValueError:
-            logging.error("Value error in total site area calculation.")
+            logger.error("Value error in total site area calculation.")
             return None  # Invalid input for total site area
             
+    @calculator("open_space", priority=8,
+                phrases=("required open space", "open space requirement"),
+                fields=("total_site_area",))
+    def process_open_space(self):
+        """Process the calculation for required open space as a percentage of the site."""
+        required_open_space = self.process_required_open_space()
+        if required_open_space:
+            return f"Required open space ≥ {required_open_space}% of total site area"
+        else:
+            return "Invalid input for required open space please specify 'Total site area = <number>'."
+
+    @calculator("outdoor_area", priority=9,
+                phrases=("required outdoor area", "outdoor area requirement", "outdoor area"),
+                fields=("unit", "peak_inpatients", "qualifying_outpatients"))
     def process_outdoor_area(self):
         """Process the calculation for required outdoor area."""
         unit_match = self.matches.get('unit')
@@ -430,8 +1007,8 @@ class BuildingDataProcessor:
                 return "Invalid input for outdoor area. Please specify 'Peak inpatients' and 'Area unit'."
 
             elif unit_match and peak_inpatients_match and qualifying_outpatients_match:
-                peak_inpatients = float(peak_inpatients_match[0])
-                qualifying_outpatients = float(qualifying_outpatients_match[0])
+                peak_inpatients = self.matches.number('peak_inpatients', 0)
+                qualifying_outpatients = self.matches.number('qualifying_outpatients', 0)
                 unit1 = unit_match[0].lower()
 
                 if unit1 in ['meter', 'm', 'meter^2', 'm^2']:
@@ -451,9 +1028,12 @@ class BuildingDataProcessor:
                 return "Invalid input for outdoor area. Please specify 'Area unit', 'Peak inpatients', and 'Qualifying outpatients'."
 
         except ValueError:
-            logging.error("Value error in outdoor area calculation.")
+            logger.error("Value error in outdoor area calculation.")
             return "Invalid input for peak inpatients or qualifying outpatients. Please specify correct numbers."
             
+    @calculator("air_volume_before_occupancy", priority=10,
+                phrases=("air volume before occupancy", "flush out before occupancy"),
+                fields=("length_widthh", "area"))
     def process_air_volume_before_occupancy(self):
         """Process the calculation for air volume needed before occupancy."""
         length_width_match = self.matches.get('length_widthh')
@@ -462,8 +1042,8 @@ class BuildingDataProcessor:
         try:
         # Case 1: Calculation based on length and width
             if length_width_match:
-                length = float(length_width_match[0] or length_width_match[6])
-                width = float(length_width_match[2] or length_width_match[4])
+                length = self.matches.number('length_widthh', 0, 6)
+                width = self.matches.number('length_widthh', 2, 4)
                 length_unit = length_width_match[1] or length_width_match[5]
                 width_unit = length_width_match[3] or length_width_match[7]
                 # Normalize units to lowercase
@@ -486,7 +1066,7 @@ class BuildingDataProcessor:
 
             # Case 2: Calculation based on area
             elif area_match:
-                area = float(area_match[0])
+                area = self.matches.number('area', 0)
                 unit = area_match[1].lower()
 
                 if unit in ['foot', 'ft', 'foot^2', 'ft^2']:
@@ -504,9 +1084,12 @@ class BuildingDataProcessor:
                 return "Invalid input for air volume calculation. Please specify area with unit or length and width with unit."
 
         except ValueError:
-            logging.error("Value error in air volume calculation.")
+            logger.error("Value error in air volume calculation.")
             return "Invalid input for length, width, or area. Please specify correct numbers."
 
+    @calculator("air_volume_to_complete", priority=12,
+                phrases=("air volume to complete", "flush out to complete"),
+                fields=("length_widthh", "area"))
     def process_air_volume_to_complete(self):
         """Process the calculation for air volume needed during occupancy to complete."""
         length_width_match = self.matches.get('length_widthh')
@@ -515,8 +1098,8 @@ class BuildingDataProcessor:
         try:
             if length_width_match:
             # Extract length and width, checking both possible groupings
-                length = float(length_width_match[0] or length_width_match[6])  # Match either 'length' or 'length2'
-                width = float(length_width_match[2] or length_width_match[4])   # Match either 'width' or 'width2'
+                length = self.matches.number('length_widthh', 0, 6)  # Match either 'length' or 'length2'
+                width = self.matches.number('length_widthh', 2, 4)   # Match either 'width' or 'width2'
                 length_unit = length_width_match[1] or length_width_match[5]    # Match either 'length_unit' or 'length_unit2'
                 width_unit = length_width_match[3] or length_width_match[7]     # Match either 'width_unit' or 'width_unit2'
 
@@ -540,7 +1123,7 @@ class BuildingDataProcessor:
 
             elif area_match:
                 # Handle case where only area is provided
-                area = float(area_match[0])
+                area = self.matches.number('area', 0)
                 unit = area_match[1].lower()
 
                 if unit in ['foot', 'ft', 'foot^2', 'ft^2']:
@@ -558,9 +1141,12 @@ class BuildingDataProcessor:
                 return "Invalid input for air volume calculation. Please specify area with unit or length and width with unit."
 
         except ValueError:
-            logging.error("Value error in air volume calculation.")
+            logger.error("Value error in air volume calculation.")
             return "Invalid input for length, width, or area. Please specify correct numbers."
 
+    @calculator("air_volume_during_occupancy", priority=11,
+                phrases=("air volume during occupancy", "flush out during occupancy"),
+                fields=("length_widthh", "area"))
     def process_air_volume_during_occupancy(self):
         """Process the calculation for air volume needed during occupancy."""
         length_width_match = self.matches.get('length_widthh')
@@ -569,8 +1155,8 @@ class BuildingDataProcessor:
         try:
             if length_width_match:
             # Extract length and width, checking both possible groupings
-                length = float(length_width_match[0] or length_width_match[6])  # Match either 'length' or 'length2'
-                width = float(length_width_match[2] or length_width_match[4])   # Match either 'width' or 'width2'
+                length = self.matches.number('length_widthh', 0, 6)  # Match either 'length' or 'length2'
+                width = self.matches.number('length_widthh', 2, 4)   # Match either 'width' or 'width2'
                 length_unit = length_width_match[1] or length_width_match[5]    # Match either 'length_unit' or 'length_unit2'
                 width_unit = length_width_match[3] or length_width_match[7]     # Match either 'width_unit' or 'width_unit2'
 
@@ -594,7 +1180,7 @@ class BuildingDataProcessor:
 
             elif area_match:
                 # Handle case where only area is provided
-                area = float(area_match[0])
+                area = self.matches.number('area', 0)
                 unit = area_match[1].lower()
 
                 if unit in ['foot', 'ft', 'foot^2', 'ft^2']:
@@ -612,9 +1198,12 @@ class BuildingDataProcessor:
                 return "Invalid input for air volume calculation. Please specify area with unit or length and width with unit."
 
         except ValueError:
-            logging.error("Value error in air volume calculation.")
+            logger.error("Value error in air volume calculation.")
             return "Invalid input for length, width, or area. Please specify correct numbers."
 
+    @calculator("Depression storage", priority=14,
+                phrases=("depression storage",),
+                fields=("fmin", "fmax", "k", "t"))
     def process_depression_storage(self):
         """Process the calculation of depression storage using the provided formula."""
         fmin_match = self.matches.get('fmin')
@@ -625,10 +1214,10 @@ class BuildingDataProcessor:
         try:
             # Ensure all necessary values are present for the calculation
             if fmin_match and fmax_match and k_match and t_match:
-                fmin = float(fmin_match[0])  # Get fmin value
-                fmax = float(fmax_match[0])  # Get fmax value
-                k = float(k_match[0])  # Get k (decay factor) value
-                t = float(t_match[0])  # Get t (time) value
+                fmin = self.matches.number('fmin', 0)  # Get fmin value
+                fmax = self.matches.number('fmax', 0)  # Get fmax value
+                k = self.matches.number('k', 0)  # Get k (decay factor) value
+                t = self.matches.number('t', 0)  # Get t (time) value
             
                 # Calculate depression storage using the formula Ft = fmin + (fmax - fmin) * e^(-kt)
                 depression_storage = fmin + (fmax - fmin) * math.exp(-k * t)
@@ -651,9 +1240,12 @@ class BuildingDataProcessor:
                 return f"Missing input for depression storage calculation. Please specify: {', '.join(missing_inputs)}."
 
         except ValueError:
-            logging.error("Value error in depression storage calculation.")
+            logger.error("Value error in depression storage calculation.")
             return "Invalid input values for depression storage calculation. Please specify correct numbers for fmin, fmax, k, and t."
 
+    @calculator("Runoff", priority=13,
+                phrases=("runoff", "Expected runoff", "run off"),
+                fields=("rainfall", "depression_storage", "infiltration", "fmin", "fmax", "k", "t"))
     def process_runoff(self):
         """Process the calculation for runoff, including the calculation of Depression storage if not provided."""
         rainfall_match = self.matches.get('rainfall')
@@ -667,23 +1259,23 @@ class BuildingDataProcessor:
 
         try:
             if rainfall_match and infiltration_match:
-                rainfall = float(rainfall_match[0])  # Get rainfall value
-                infiltration = float(infiltration_match[0])  # Get infiltration value
+                rainfall = self.matches.number('rainfall', 0)  # Get rainfall value
+                infiltration = self.matches.number('infiltration', 0)  # Get infiltration value
             
             # Case 1: Depression storage is provided
                 if depression_storage_match:
-                    depression_storage = float(depression_storage_match[0])
+                    depression_storage = self.matches.number('depression_storage', 0)
                 # Case 2: Depression storage needs to be calculated using the provided equation
                 elif fmin_match and fmax_match and k_match and t_match:
-                    fmin = float(fmin_match[0])  # Get fmin value
-                    fmax = float(fmax_match[0])  # Get fmax value
-                    k = float(k_match[0])  # Get k (decay factor) value
-                    t = float(t_match[0])  # Get t (time) value
+                    fmin = self.matches.number('fmin', 0)  # Get fmin value
+                    fmax = self.matches.number('fmax', 0)  # Get fmax value
+                    k = self.matches.number('k', 0)  # Get k (decay factor) value
+                    t = self.matches.number('t', 0)  # Get t (time) value
                 
                     # Calculate depression storage using the formula Ft = fmin + (fmax - fmin) * e^(-kt)
                     depression_storage = fmin + (fmax - fmin) * math.exp(-k * t)
                     depression_storage = round(depression_storage, 2)  # Round for cleaner output
-                    logging.debug(f"Depression storage calculated as {depression_storage} mm/hr")
+                    logger.debug("Depression storage calculated as %s mm/hr", depression_storage)
                 else:
                     # If necessary inputs are missing for depression storage calculation
                     missing_inputs = []
@@ -721,9 +1313,12 @@ class BuildingDataProcessor:
                 return f"Missing input for runoff calculation. Please specify: {', '.join(missing_inputs)}."
 
         except ValueError:
-            logging.error("Value error in runoff calculation.")
+            logger.error("Value error in runoff calculation.")
             return "Invalid input values for runoff calculation. Please specify correct numbers for Rainfall, Depression Storage, and Infiltration."
 
+    @calculator("development_percentage", priority=15,
+                phrases=("previously developed land", "percentage of previously developed land"),
+                fields=("previously_area", "development_footprint"))
     def process_development_percentage(self):
         """Process the calculation for percentage of development on previously developed land."""
         previously_area_match = self.matches.get('previously_area')  # Area of previously developed land
@@ -731,8 +1326,8 @@ class BuildingDataProcessor:
 
         try:
             if previously_area_match and development_footprint_match:
-                previously_developed_land = float(previously_area_match[0])  # Get previously developed land area
-                development_footprint = float(development_footprint_match[0])  # Get development footprint area
+                previously_developed_land = self.matches.number('previously_area', 0)  # Get previously developed land area
+                development_footprint = self.matches.number('development_footprint', 0)  # Get development footprint area
 
                 if development_footprint == 0:
                     return "Area of development footprint cannot be zero."
@@ -755,9 +1350,12 @@ class BuildingDataProcessor:
 
         
         except ValueError:
-            logging.error("Value error in development percentage calculation.")
+            logger.error("Value error in development percentage calculation.")
             return "Invalid input values for development percentage. Please specify correct numbers."
 
+    @calculator("bicycle_racks", priority=16,
+                phrases=("number of bicycle racks required", "total of bicycle racks", "bicycle racks"),
+                fields=("occupants", "area_racks", "long_term", "short_term"))
     def process_bicycle_racks(self):
         """Process the calculation for bicycle racks, both long-term and short-term."""
         occupants_match = self.matches.get('occupants')
@@ -768,23 +1366,26 @@ class BuildingDataProcessor:
         if long_term_match or not short_term_match:
             if occupants_match:
                 try:
-                    occupants = float(occupants_match[1])  # Get the number of occupants
+                    occupants = self.matches.number('occupants', 1)  # Get the number of occupants
                     total_racks = math.ceil(occupants / 20)
                     return f"Total number of bicycle racks required (long-term): {total_racks}"
                 except ValueError:
-                    logging.error("Invalid value for occupants in long-term bicycle storage calculation.")
+                    logger.error("Invalid value for occupants in long-term bicycle storage calculation.")
                     return "Invalid input for building occupants. Please specify a correct number."
             # Condition 2: Short-term storage
             elif area_racks_match:
                 try:
-                    area = float(area_racks_match[1])  # Get the area
+                    area = self.matches.number('area_racks', 1)  # Get the area
                     total_racks = math.ceil(area / 500)
                     return f"Total number of bicycle racks required (short-term): {total_racks}"
                 except ValueError:
-                    logging.error("Invalid value for area in short-term bicycle storage calculation.")
+                    logger.error("Invalid value for area in short-term bicycle storage calculation.")
                     return "Invalid input for area. Please specify a correct number."
         return "Invalid input for bicycle racks. Please specify building occupants or area with the appropriate term (long-term or short-term)."
 
+    @calculator("energy_performance", priority=17,
+                phrases=("energy performance", "energy improvement"),
+                fields=("baseline_energy", "proposed_energy"))
     def process_energy_performance(self):
         """Process the calculation for percentage improvement in energy consumption."""
         baseline_energy_match = self.matches.get('baseline_energy')
@@ -792,8 +1393,8 @@ class BuildingDataProcessor:
 
         if baseline_energy_match and proposed_energy_match:
             try:
-                baseline_energy = float(baseline_energy_match[0])
-                proposed_energy = float(proposed_energy_match[0])
+                baseline_energy = self.matches.number('baseline_energy', 0)
+                proposed_energy = self.matches.number('proposed_energy', 0)
                 
                 if baseline_energy == 0:
                     return "Baseline Annual Energy Consumption cannot be zero."
@@ -802,7 +1403,7 @@ class BuildingDataProcessor:
                 improvement = math.ceil(((baseline_energy - proposed_energy) / baseline_energy) * 100)
                 return f"Percentage Improvement in Energy Consumption: {improvement}%"
             except ValueError:
-                logging.error("Invalid input values for energy consumption.")
+                logger.error("Invalid input values for energy consumption.")
                 return "Invalid input for energy consumption. Please specify correct numbers."
         elif baseline_energy_match and not proposed_energy_match:
             return "Invalid input for Energy performance. Please specify proposed energy."
@@ -811,6 +1412,9 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for Energy performance. Please specify baseline energy and proposed energy."
 
+    @calculator("u_value", priority=18,
+                phrases=("u-value", "u value"),
+                fields=("R_value", "material_thickness", "thermal_conductivity"))
     def process_u_value(self):
         """Process the calculation for U-value."""
         R_value_match = self.matches.get('R_value')
@@ -819,7 +1423,7 @@ class BuildingDataProcessor:
 
         if R_value_match:
             try:
-                R_value = float(R_value_match[0])
+                R_value = self.matches.number('R_value', 0)
                 
                 if R_value == 0:
                     return "R-value cannot be zero."
@@ -828,12 +1432,12 @@ class BuildingDataProcessor:
                 U_value = math.ceil(1 / R_value)
                 return f"U-value = {U_value} (W/m²·K)"
             except ValueError:
-                logging.error("Value error in U-value calculation.")
+                logger.error("Value error in U-value calculation.")
                 return "Invalid input values for R-value. Please specify correct numbers."
         elif material_thickness_match and thermal_conductivity_match:
             try:
-                material_thickness = float(material_thickness_match[0])
-                thermal_conductivity = float(thermal_conductivity_match[0])
+                material_thickness = self.matches.number('material_thickness', 0)
+                thermal_conductivity = self.matches.number('thermal_conductivity', 0)
                 
                 if thermal_conductivity == 0:
                     return "Thermal conductivity cannot be zero."
@@ -844,7 +1448,7 @@ class BuildingDataProcessor:
                 U_value = math.ceil(1 / R_value)
                 return f"U-value = {U_value} (W/m²·K)"
             except ValueError:
-                logging.error("Value error in U-value calculation.")
+                logger.error("Value error in U-value calculation.")
                 return "Invalid input values for material thickness or thermal conductivity. Please specify correct numbers."
         elif material_thickness_match and not thermal_conductivity_match:
             return "Invalid input for U-value calculation. Please specify 'Thermal Conductivity'."
@@ -853,6 +1457,9 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for U-value calculation. Please specify either 'R-value' or both 'Material Thickness' and 'Thermal Conductivity'."
 
+    @calculator("r_value", priority=19,
+                phrases=("r-value", "r value"),
+                fields=("material_thickness", "thermal_conductivity"))
     def process_r_value(self):
         """Process the calculation for R-value."""
         material_thickness_match = self.matches.get('material_thickness')
@@ -861,8 +1468,8 @@ class BuildingDataProcessor:
         if material_thickness_match and thermal_conductivity_match:
             try:
                 # Extract and convert values
-                material_thickness = float(material_thickness_match[0])
-                thermal_conductivity = float(thermal_conductivity_match[0])
+                material_thickness = self.matches.number('material_thickness', 0)
+                thermal_conductivity = self.matches.number('thermal_conductivity', 0)
                 
                 if thermal_conductivity == 0:
                     return "Thermal conductivity cannot be zero."
@@ -871,7 +1478,7 @@ class BuildingDataProcessor:
                 R_value = math.ceil(material_thickness / thermal_conductivity)
                 return f"R-value = {R_value} (m²·K/W)"
             except ValueError:
-                logging.error("Value error in R-value calculation.")
+                logger.error("Value error in R-value calculation.")
                 return "Invalid input values for material thickness or thermal conductivity. Please specify correct numbers."
         elif material_thickness_match and not thermal_conductivity_match:
             return "Invalid input for R-value calculation. Please specify 'Thermal Conductivity'."
@@ -880,6 +1487,9 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for R-value calculation. Please specify both 'Material Thickness' and 'Thermal Conductivity'."
 
+    @calculator("shw", priority=20,
+                phrases=("hot water demand provided by shw",),
+                fields=("shw_generated", "hot_water_demand"))
     def process_shw(self):
         """Process the calculation for SHW (Solar Hot Water) percentage."""
         shw_generated_match = self.matches.get('shw_generated')
@@ -887,8 +1497,8 @@ class BuildingDataProcessor:
 
         if shw_generated_match and hot_water_demand_match:
             try:
-                shw_generated = float(shw_generated_match[0])
-                hot_water_demand = float(hot_water_demand_match[0])
+                shw_generated = self.matches.number('shw_generated', 0)
+                hot_water_demand = self.matches.number('hot_water_demand', 0)
 
                 if hot_water_demand == 0:
                     return "Annual hot water demand cannot be zero."
@@ -897,7 +1507,7 @@ class BuildingDataProcessor:
                 percentage_shw = math.ceil((shw_generated / hot_water_demand) * 100)
                 return f"{percentage_shw}% of hot water demand is provided by SHW panels"
             except ValueError:
-                logging.error("Value error in SHW calculation.")
+                logger.error("Value error in SHW calculation.")
                 return "Invalid input for hot water generated or demand. Please specify correct numbers."
         elif shw_generated_match and not hot_water_demand_match:
             return "Invalid input for SHW calculation. Please specify 'Annual hot water demand'."
@@ -906,6 +1516,9 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for SHW calculation. Please specify both 'Annual hot water generated by SHW panels' and 'Annual hot water demand'."
 
+    @calculator("renewable_energy", priority=21,
+                phrases=("renewable energy",),
+                fields=("pv_energy_generated", "proposed_energy_consumption", "annual_energy_generated", "community_energy_consumed"))
     def process_renewable_energy(self):
         """Process the calculation for Renewable Energy percentage."""
         pv_energy_generated_match = self.matches.get('pv_energy_generated')
@@ -915,8 +1528,8 @@ class BuildingDataProcessor:
 
         if pv_energy_generated_match and proposed_energy_consumption_match:
             try:
-                pv_energy_generated = float(pv_energy_generated_match[0])
-                proposed_energy_consumption = float(proposed_energy_consumption_match[0])
+                pv_energy_generated = self.matches.number('pv_energy_generated', 0)
+                proposed_energy_consumption = self.matches.number('proposed_energy_consumption', 0)
 
                 if proposed_energy_consumption == 0:
                     return "Proposed building annual energy consumption cannot be zero."
@@ -925,12 +1538,12 @@ class BuildingDataProcessor:
                 percentage_renewable_energy = math.ceil((pv_energy_generated / proposed_energy_consumption) * 100)
                 return f"{percentage_renewable_energy}% of the building's energy is provided by the PV system"
             except ValueError:
-                logging.error("Value error in Renewable Energy calculation.")
+                logger.error("Value error in Renewable Energy calculation.")
                 return "Invalid input for PV energy generated or proposed energy consumption. Please specify correct numbers."
         elif annual_energy_generated_match and community_energy_consumed_match:
             try:
-                annual_energy_generated = float(annual_energy_generated_match[0])
-                community_energy_consumed = float(community_energy_consumed_match[0])
+                annual_energy_generated = self.matches.number('annual_energy_generated', 0)
+                community_energy_consumed = self.matches.number('community_energy_consumed', 0)
 
                 if community_energy_consumed == 0:
                     return "Annual community energy consumption cannot be zero."
@@ -939,7 +1552,7 @@ class BuildingDataProcessor:
                 renewable_energy_percentage = math.ceil((annual_energy_generated / community_energy_consumed) * 100)
                 return f"Renewable Energy = {renewable_energy_percentage}%"
             except ValueError:
-                logging.error("Value error in Renewable Energy calculation.")
+                logger.error("Value error in Renewable Energy calculation.")
                 return "Invalid input for renewable energy generated or community energy consumption. Please specify correct numbers."
         elif pv_energy_generated_match and not proposed_energy_consumption_match:
             return "Invalid input for Renewable Energy calculation. Please specify 'Proposed building annual energy consumption'."
@@ -952,6 +1565,9 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for Renewable Energy calculation. Please specify both 'Energy generated by PV' and 'Proposed building annual energy consumption', or both 'Annual energy generated' and 'Community energy consumption'."
 
+    @calculator("occupant_density", priority=22,
+                phrases=("occupant density",),
+                fields=("designed_occupancy", "expected_occupancy", "areaa", "length_width"))
     def process_occupant_density(self):
         """Process the calculation for occupant density."""
         designed_occupancy_match = self.matches.get('designed_occupancy')
@@ -962,9 +1578,9 @@ class BuildingDataProcessor:
         # Check if either designed maximum occupancy or expected occupancy is provided
         occupancy = None
         if designed_occupancy_match:
-            occupancy = float(designed_occupancy_match[0])
+            occupancy = self.matches.number('designed_occupancy', 0)
         elif expected_occupancy_match:
-            occupancy = float(expected_occupancy_match[0])
+            occupancy = self.matches.number('expected_occupancy', 0)
 
         # If neither occupancy type is provided, return an error
         if occupancy is None:
@@ -974,7 +1590,7 @@ class BuildingDataProcessor:
         area = None
         if area_match:
             try:
-                area_value = float(area_match[0])
+                area_value = self.matches.number('areaa', 0)
                 unit = area_match[1] if area_match[1] else "meter"
                 unit = unit.lower()
                 # If the unit is in feet, return an error
@@ -988,8 +1604,8 @@ class BuildingDataProcessor:
         if length_width_match:
             try:
                 # Since match.groups() is a tuple, access the values directly via indexing
-                length = float(length_width_match[0] or length_width_match[6])
-                width = float(length_width_match[2] or length_width_match[4])
+                length = self.matches.number('length_width', 0, 6)
+                width = self.matches.number('length_width', 2, 4)
                 length_unit = length_width_match[1] or length_width_match[5]
                 width_unit = length_width_match[3] or length_width_match[7]
 
@@ -1009,12 +1625,15 @@ class BuildingDataProcessor:
         occupant_density = math.ceil(occupancy / area)
         return f"Occupant Density = {occupant_density} people per square meter"
 
+    @calculator("size_of_outdoor_space", priority=23,
+                phrases=("size of outdoor space",),
+                fields=("total_occupancy",))
     def process_size_of_outdoor_space(self):
         """Process the calculation for the size of the outdoor space."""
         total_occupancy_match = self.matches.get('total_occupancy')
         if total_occupancy_match:
             try:
-                total_occupancy = float(total_occupancy_match[0])
+                total_occupancy = self.matches.number('total_occupancy', 0)
                 Size_of_Outdoor_Space = math.ceil(total_occupancy *0.25)
                 return f"{Size_of_Outdoor_Space} m^2"
             except ValueError:
@@ -1022,14 +1641,17 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for occupant density. Please specify total occupancy = '<number>'."
 
+    @calculator("adhesives_sealants_intent", priority=24,
+                phrases=("compliant adhesives and sealants",),
+                fields=("compliant_adhesives", "total_adhesives"))
     def process_adhesives_sealants(self):
         """Process the calculation for compliant adhesives and sealants."""
-        compliant_adhesives_match = re.search(self.patterns["compliant_adhesives"], self.input_text)
-        total_adhesives_match = re.search(self.patterns["total_adhesives"], self.input_text)
+        compliant_adhesives_match = self.matches.get('compliant_adhesives')
+        total_adhesives_match = self.matches.get('total_adhesives')
         if compliant_adhesives_match and total_adhesives_match:
             try:
-                weight_compliant = float(compliant_adhesives_match.group(1))
-                total_weight = float(total_adhesives_match.group(1))
+                weight_compliant = self.matches.number('compliant_adhesives', 0)
+                total_weight = self.matches.number('total_adhesives', 0)
 
                 if total_weight == 0:
                     return "Total weight of all adhesives and sealants cannot be zero."
@@ -1038,7 +1660,7 @@ class BuildingDataProcessor:
                 percentage_compliant = math.ceil((weight_compliant / total_weight) * 100)
                 return f"{percentage_compliant}% of adhesives and sealants are compliant"
             except ValueError:
-                logging.error("Value error in compliant adhesives calculation.")
+                logger.error("Value error in compliant adhesives calculation.")
                 return "Invalid input values for adhesives and sealants. Please specify correct numbers."
         elif compliant_adhesives_match and not total_adhesives_match:
             return "Invalid input for adhesives and sealants calculation. Please specify  'Total weight'."
@@ -1047,14 +1669,17 @@ class BuildingDataProcessor:
         else:
                 return "Invalid input for adhesives and sealants calculation. Please specify both 'Weight of adhesives and sealants not exceeding VOC limits' and 'Total weight'."
     
+    @calculator("waste_diverted_intent", priority=25,
+                phrases=("waste diverted from landfill",),
+                fields=("recycled", "reused", "salvaged", "donated", "reclaimed", "total_waste"))
     def process_waste_diverted(self):
         """Process the calculation for % Waste Diverted from Landfill."""
-        recycled_match = re.search(self.patterns['recycled'], self.input_text)
-        reused_match = re.search(self.patterns['reused'], self.input_text)
-        salvaged_match = re.search(self.patterns['salvaged'], self.input_text)
-        donated_match = re.search(self.patterns['donated'], self.input_text)
-        reclaimed_match = re.search(self.patterns['reclaimed'], self.input_text)
-        total_waste_match = re.search(self.patterns['total_waste'], self.input_text)
+        recycled_match = self.matches.get('recycled')
+        reused_match = self.matches.get('reused')
+        salvaged_match = self.matches.get('salvaged')
+        donated_match = self.matches.get('donated')
+        reclaimed_match = self.matches.get('reclaimed')
+        total_waste_match = self.matches.get('total_waste')
         # Check if more than one waste management method is provided
         methods_count = sum(bool(match) for match in [recycled_match, reused_match, salvaged_match, donated_match, reclaimed_match])
         if methods_count > 1:
@@ -1063,19 +1688,19 @@ class BuildingDataProcessor:
             # Proceed with calculation if only one method is present
         waste_diverted = None
         if recycled_match:
-            waste_diverted = float(recycled_match.group(2))
+            waste_diverted = self.matches.number('recycled', 1)
         elif reused_match:
-            waste_diverted = float(reused_match.group(2))
+            waste_diverted = self.matches.number('reused', 1)
         elif salvaged_match:
-            waste_diverted = float(salvaged_match.group(2))
+            waste_diverted = self.matches.number('salvaged', 1)
         elif donated_match:
-            waste_diverted = float(donated_match.group(2))
+            waste_diverted = self.matches.number('donated', 1)
         elif reclaimed_match:
-            waste_diverted = float(reclaimed_match.group(2))
+            waste_diverted = self.matches.number('reclaimed', 1)
 
         if waste_diverted is not None and total_waste_match:
             try:
-                total_waste = float(total_waste_match.group(2))
+                total_waste = self.matches.number('total_waste', 1)
 
                 if total_waste == 0:
                     return "Total amount of waste generated cannot be zero."
@@ -1084,19 +1709,22 @@ class BuildingDataProcessor:
                 percentage_waste_diverted = math.ceil((waste_diverted / total_waste) * 100)
                 return f"{percentage_waste_diverted}% of waste is diverted from landfill"
             except ValueError:
-                logging.error("Value error in waste diverted calculation.")
+                logger.error("Value error in waste diverted calculation.")
                 return "Invalid input values for waste calculation. Please specify correct numbers."
         else:
             return "Invalid input for waste diverted calculation. Please specify both 'Amount of waste recycled, reused, salvaged, donated, or reclaimed' and 'Total amount of waste generated'."
 
+    @calculator("connectivity_index_intent", priority=26,
+                phrases=("connectivity index",),
+                fields=("street_links", "nodes"))
     def process_connectivity_index(self):
         """Process the calculation for the Connectivity Index."""
-        street_links_match = re.search(self.patterns['street_links'], self.input_text)
-        nodes_match = re.search(self.patterns['nodes'], self.input_text)
+        street_links_match = self.matches.get('street_links')
+        nodes_match = self.matches.get('nodes')
         if street_links_match and nodes_match:
             try:
-                street_links = int(street_links_match.group(1))
-                nodes = int(nodes_match.group(1))
+                street_links = self.matches.integer('street_links', 0)
+                nodes = self.matches.integer('nodes', 0)
 
                 if nodes == 0:
                     return "Number of nodes cannot be zero."
@@ -1105,7 +1733,7 @@ class BuildingDataProcessor:
                 connectivity_index = math.ceil(street_links / nodes)
                 return f"Connectivity Index = {connectivity_index}"
             except ValueError:
-                logging.error("Value error in Connectivity Index calculation.")
+                logger.error("Value error in Connectivity Index calculation.")
                 return "Invalid input values for street links or nodes. Please specify correct numbers."
         elif street_links_match and not nodes_match:
             return "Invalid input for Connectivity Index calculation. Please specify 'Nodes = <number>'."
@@ -1114,21 +1742,24 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for Connectivity Index calculation. Please specify both 'Street links = <number>' and 'Nodes = <number>'."
 
+    @calculator("intersection_density_intent", priority=27,
+                phrases=("intersection density",),
+                fields=("intersections", "area", "length_width"))
     def process_intersection_density(self):
         """Process the calculation for Intersection Density."""
-        intersections_match = re.search(self.patterns['intersections'], self.input_text)
-        area_match = re.search(self.patterns['area'], self.input_text)
-        length_width_match = re.search(self.patterns['length_width'], self.input_text)
+        intersections_match = self.matches.get('intersections')
+        area_match = self.matches.get('area')
+        length_width_match = self.matches.get('length_width')
         if intersections_match:
             try:
-                intersections = int(intersections_match.group(1))
+                intersections = self.matches.integer('intersections', 0)
                 area = None
 
                 # Handle area input
                 if area_match:
                     try:
-                        area_value = float(area_match.group(1))
-                        area_unit = area_match.group(2).lower() if area_match.group(2) else None  # Ensure unit is extracted
+                        area_value = self.matches.number('area', 0)
+                        area_unit = area_match[1].lower() if area_match[1] else None  # Ensure unit is extracted
                             
                         if area_unit in ['foot', 'ft', 'foot^2', 'ft^2']:
                             area = area_value / 10.764  # Convert ft² to m²
@@ -1142,10 +1773,10 @@ class BuildingDataProcessor:
                 # Handle length and width input if area is not available
                 if length_width_match and area is None:
                     try:
-                        length = float(length_width_match.group('length') or length_width_match.group('length2'))
-                        width = float(length_width_match.group('width') or length_width_match.group('width2'))
-                        length_unit = length_width_match.group('length_unit') or length_width_match.group('length_unit2')
-                        width_unit = length_width_match.group('width_unit') or length_width_match.group('width_unit2')
+                        length = self.matches.number('length_width', 0, 6)
+                        width = self.matches.number('length_width', 2, 4)
+                        length_unit = length_width_match[1] or length_width_match[7]
+                        width_unit = length_width_match[3] or length_width_match[5]
                             
                         # Convert units to meters for area calculation
                         if length_unit in ['foot', 'ft'] and width_unit in ['foot', 'ft']:
@@ -1165,21 +1796,24 @@ class BuildingDataProcessor:
                 intersection_density = math.ceil(intersections / area)
                 return f"Intersection Density = {intersection_density} intersections/m²"
             except ValueError:
-                logging.error("Value error in Intersection Density calculation.")
+                logger.error("Value error in Intersection Density calculation.")
                 return "Invalid input values for Intersection Density. Please specify correct numbers."
         else:
             return "Invalid input for Intersection Density. Please specify 'Intersections = <number>'."
 
+    @calculator("continuous_walkway_intent", priority=28,
+                phrases=("continuous walkway", "cw"),
+                fields=("continuous_walkway_on_both", "all_walkways"))
     def process_continuous_walkway(self):
         """Process the calculation for Continuous Walkway (CW)."""
-        continuous_walkway_match = re.search(self.patterns['continuous_walkway_on_both'], self.input_text)
-        all_walkways_match = re.search(self.patterns['all_walkways'], self.input_text)
+        continuous_walkway_match = self.matches.get('continuous_walkway_on_both')
+        all_walkways_match = self.matches.get('all_walkways')
 
         if continuous_walkway_match and all_walkways_match:
             try:
                 # Extract continuous walkway and all walkways length
-                continuous_walkway_length = float(continuous_walkway_match.group(1))
-                all_walkways_length = float(all_walkways_match.group(1))
+                continuous_walkway_length = self.matches.number('continuous_walkway_on_both', 0)
+                all_walkways_length = self.matches.number('all_walkways', 0)
 
                 # Check if all walkways length is zero
                 if all_walkways_length == 0:
@@ -1189,7 +1823,7 @@ class BuildingDataProcessor:
                 CW = math.ceil((continuous_walkway_length / all_walkways_length) * 100)
                 return f"Continuous Walkway (CW) = {CW}%"
             except ValueError:
-                logging.error("Value error in Continuous Walkway calculation.")
+                logger.error("Value error in Continuous Walkway calculation.")
                 return "Invalid input values for continuous walkways or all walkways. Please specify correct numbers."
         elif continuous_walkway_match and not all_walkways_match:
             return "Invalid input for Continuous Walkway calculation. Please specify 'All walkways'."
@@ -1198,15 +1832,18 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for Continuous Walkway calculation. Please specify both 'Linear length on both sides' and 'All walkways'."
 
+    @calculator("far", priority=29,
+                phrases=("floor area ratio", "far"),
+                fields=("gfa", "site_area"))
     def process_Floor_Area_Ratio(self):
         """ process the calculation for Floor Area Ratio (FAR)."""
-        gfa_match = re.search(self.patterns['gfa'],self.input_text)
-        site_area_match = re.search(self.patterns['site_area'],self.input_text)
+        gfa_match = self.matches.get('gfa')
+        site_area_match = self.matches.get('site_area')
 
         if gfa_match and site_area_match:
             try:
-                gfa_value = float(gfa_match.group(3))
-                site_area_value = float(site_area_match.group(1))
+                gfa_value = self.matches.number('gfa', 2)
+                site_area_value = self.matches.number('site_area', 0)
 
                 #check if site area is zero
                 if site_area_value==0:
@@ -1216,7 +1853,7 @@ class BuildingDataProcessor:
                 FAR = math.ceil((gfa_value/site_area_value)*100)
                 return f"Floor Area Ratio (FAR) = {FAR}%"
             except ValueError:
-                logging.error("Value error in Floor Area Ratio.")
+                logger.error("Value error in Floor Area Ratio.")
                 return "Invalid input values for Total gross floor area or Total site area. Please specify correct numbers."
         elif gfa_match and not site_area_match:
             return "Invalid input for Floor Area Ratio.Please specify 'total site area'."
@@ -1225,15 +1862,18 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for Floor Area Ratio.Please specify 'gross floor area' and 'total site area'."
 
+    @calculator("seer", priority=30,
+                phrases=("seer",),
+                fields=("cooling_provided", "energy_consumed"))
     def process_seer(self):
         """ process the calculation for SEER."""
-        cooling_provided_match = re.search(self.patterns['cooling_provided'],self.input_text)
-        energy_consumed_match =  re.search(self.patterns['energy_consumed'],self.input_text)
+        cooling_provided_match = self.matches.get('cooling_provided')
+        energy_consumed_match = self.matches.get('energy_consumed')
 
         if cooling_provided_match and energy_consumed_match:
             try:
-                cooling_provided_value = float(cooling_provided_match.group(1))
-                energy_consumed_value = float(energy_consumed_match.group(1))
+                cooling_provided_value = self.matches.number('cooling_provided', 0)
+                energy_consumed_value = self.matches.number('energy_consumed', 0)
 
                 #Check if Energy consumed is zero
                 if energy_consumed_value==0:
@@ -1243,7 +1883,7 @@ class BuildingDataProcessor:
                 seer = math.ceil((cooling_provided_value / energy_consumed_value) * 100)
                 return f"SEER = {seer}%"
             except ValueError:
-                logging.error("Value error in SEER calculation.")
+                logger.error("Value error in SEER calculation.")
                 return "Invalid input values for cooling provided or energy consumed. Please specify correct numbers."
         elif cooling_provided_match and not energy_consumed_match:
             return "Invalid input for SEER calculation. Please specify 'Energy consumed'."
@@ -1252,15 +1892,18 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for SEER calculation. Please specify both 'Cooling provided' and 'Energy consumed'."
 
+    @calculator("compliant_paints", priority=31,
+                phrases=("compliant paints and coating", "compliant paints and coatings"),
+                fields=("compliant_paints", "total_paints"))
     def process_compliant_paints_coatings(self):
         """ process the calculation for compliant paints and coatings."""
-        compliant_paints_match=re.search(self.patterns['compliant_paints'],self.input_text)
-        total_paints_match=re.search(self.patterns['total_paints'],self.input_text)
+        compliant_paints_match=self.matches.get('compliant_paints')
+        total_paints_match=self.matches.get('total_paints')
 
         if  compliant_paints_match and total_paints_match:
             try:
-                weight_compliant = float(compliant_paints_match.group(1))
-                total_weight = float(total_paints_match.group(1))
+                weight_compliant = self.matches.number('compliant_paints', 0)
+                total_weight = self.matches.number('total_paints', 0)
 
                 if total_weight == 0:
                     return "Total weight of all paints and coatings cannot be zero."
@@ -1269,7 +1912,7 @@ class BuildingDataProcessor:
                 percentage_compliant = math.ceil((weight_compliant / total_weight) * 100)
                 return f"{percentage_compliant}% of paints and coatings are compliant"
             except ValueError:
-                logging.error("Value error in compliant paints calculation.")
+                logger.error("Value error in compliant paints calculation.")
                 return "Invalid input values for paints and coatings. Please specify correct numbers."
         elif compliant_paints_match and not total_paints_match:
             return "Invalid input for compliant paints and coatings. Please specify 'Total weight'."
@@ -1278,6 +1921,9 @@ class BuildingDataProcessor:
         else:
             return "Invalid input for compliant paints and coatings. Please specify both 'Weight not exceeding VOC' and 'Total weight'."
 
+    @calculator("dwelling_building_size", priority=32,
+                phrases=("dwelling size", "building size"),
+                fields=("building_typee", "occupantss", "total_occupancy", "Dwelling_building_size"))
     def process_dwelling_building_size(self):
         """Process the calculation of Dwelling-Size of Private and Communal Outdoor Space."""
         building_type_matchh = self.matches.get('building_typee')
@@ -1286,8 +1932,8 @@ class BuildingDataProcessor:
         Dwelling_building_match = self.matches.get('Dwelling_building_size')
 
          # Add logging to debug extracted matches
-        logging.debug(f"Building type: {building_type_matchh}")  # Log building type match
-        logging.debug(f"Dwelling size: {Dwelling_building_match}")  # Log dwelling size match
+        logger.debug("Building type: %s", building_type_matchh)  # Log building type match
+        logger.debug("Dwelling size: %s", Dwelling_building_match)  # Log dwelling size match
 
 
         try:
@@ -1305,7 +1951,7 @@ class BuildingDataProcessor:
             # Case 1: Individual Dwelling - Size of Private
             if building_type == "individual" and dwelling_size == "private":
                 if occupants_match:
-                    persons = int(occupants_match[1])  # Extract number of occupants
+                    persons = self.matches.integer('occupantss', 1)  # Extract number of occupants
                     if persons <= 2:
                         return f"Individual Dwelling - Size of Private: 5 m²"
                     else:
@@ -1316,7 +1962,7 @@ class BuildingDataProcessor:
             # Case 2: Multi-Residential Building - Size of Private
             elif building_type == "multi-residential" and dwelling_size == "private":
                 if occupants_match:
-                    persons = int(occupants_match[1])  # Extract number of occupants
+                    persons = self.matches.integer('occupantss', 1)  # Extract number of occupants
                     if persons <= 2:
                         return f"Multi-Residential Building - Size of Private: 5 m²"
                     else:
@@ -1327,7 +1973,7 @@ class BuildingDataProcessor:
             # Case 3: Multi-Residential Building - Size of Communal Outdoor Space
             elif building_type == "multi-residential" and dwelling_size == "communal" :
                 if total_occupancy_match:
-                    total_occupancy = int(total_occupancy_match[0])  # Extract total occupancy
+                    total_occupancy = self.matches.integer('total_occupancy', 0)  # Extract total occupancy
                     communal_space = math.ceil(total_occupancy * 0.25)  # Size of Outdoor Space
                     return f"Multi-Residential Building - Size of Communal Outdoor Space: {communal_space} m²"
                 else:
@@ -1336,82 +1982,183 @@ class BuildingDataProcessor:
             else:
                 return "Invalid building type or dwelling size."
         except ValueError:
-            logging.error("Value error in Dwelling-Size of Private or Communal Outdoor Space calculation.")
+            logger.error("Value error in Dwelling-Size of Private or Communal Outdoor Space calculation.")
             return "Invalid input for occupants or total occupancy. Please specify correct numbers."
             
-    def process(self):
-        """Main method to process intents and return results."""
-        if self.intents.get('long_term_storage'):
-            return self.process_long_term_storage()
-        elif self.intents.get('short_term_storage'):
-            return self.process_short_term_storage()
-        elif self.intents.get('shower_facilities'):
-            return self.process_shower_facilities()
-        elif self.intents['preferred_spaces']:
-            return self.process_preferred_spaces()
-        elif self.intents['fueling_stations']:
-            return self.process_fueling_stations()
-        elif self.intents['restoration_area']:
-            return self.process_restoration_area()
-        elif self.intents['vegetated_space']:
-            return self.process_vegetated_space()
-        elif self.intents['open_space']:
-            required_open_space = self.process_required_open_space()
-            if required_open_space:
-                return f"Required open space ≥ {required_open_space}% of total site area"
+    def cache_key(self, calc):
+        """Canonical key for a calculation: the intent plus everything its calculator reads."""
+        return (
+            calc.intent,
+            tuple(self.matches.get(field) for field in calc.fields),
+            tuple(self.matches.mentions(keyword) for keyword in calc.keywords),
+        )
+
+    def process(self, input_text: str = None, intent: str = None):
+        """Main method to process intents and return results.
+
+        When input_text is given the processor is reloaded with it first, so a
+        single instance can be reused across messages.
+        """
+        if input_text is not None:
+            self.load(input_text, intent)
+        started = time.perf_counter()
+        try:
+            return self._dispatch()
+        finally:
+            self.timings["calculate"] = time.perf_counter() - started
+
+    def _dispatch(self):
+        intent = self.primary_intent()
+        if intent is not None:
+            calc = CALCULATORS[intent]
+            key = self.cache_key(calc)
+            result = RESULTS.get(key, _MISSING)
+            if result is _MISSING:
+                result = calc.handler(self)
+                RESULTS.put(key, result)
+                self.outcome = "calculated"
             else:
-                return "Invalid input for required open space please specify 'Total site area = <number>'."
-        elif self.intents['outdoor_area']:
-            return self.process_outdoor_area()
-        elif self.intents['air_volume_before_occupancy']:
-            return self.process_air_volume_before_occupancy()
-        elif self.intents['air_volume_during_occupancy']:
-            return self.process_air_volume_during_occupancy()
-        elif self.intents['air_volume_to_complete']:
-            return self.process_air_volume_to_complete()
-        elif self.intents['Runoff']:
-            return self.process_runoff()
-        elif self.intents['Depression storage']:
-            return self.process_depression_storage()
-        elif self.intents['development_percentage']:
-            return self.process_development_percentage()
-        elif self.intents['bicycle_racks']:
-            return self.process_bicycle_racks()
-        elif self.intents['energy_performance']:
-            return self.process_energy_performance()
-        elif self.intents['u_value']:
-            return self.process_u_value()
-        elif self.intents['r_value']:
-            return self.process_r_value()
-        elif self.intents['shw']:
-            return self.process_shw()
-        elif self.intents['renewable_energy']:
-            return self.process_renewable_energy()
-        elif self.intents['occupant_density']:
-            return self.process_occupant_density()
-        elif  self.intents['size_of_outdoor_space']:
-            return self.process_size_of_outdoor_space()
-        elif self.intents['adhesives_sealants_intent']:
-            return self. process_adhesives_sealants()
-        elif self.intents['waste_diverted_intent']:
-            return self.process_waste_diverted()
-        elif self.intents['connectivity_index_intent']:
-            return self.process_connectivity_index()
-        elif self.intents['intersection_density_intent']:
-            return self.process_intersection_density()
-        elif self.intents['continuous_walkway_intent']:
-            return self.process_continuous_walkway()
-        elif self.intents['far']:
-            return self.process_Floor_Area_Ratio()
-        elif self.intents['seer']:
-            return self.process_seer()
-        elif self.intents['compliant_paints']:
-            return self.process_compliant_paints_coatings()
-        elif self.intents['dwelling_building_size']:
-            return self.process_dwelling_building_size()
+                self.outcome = "cached"
+            return result
         elif not any(char.isdigit() for char in self.input_text):
+            self.outcome = "no_number"
             return "No valid number in the response"
-        # Add more processing for other intents...
+        # New intents are added by registering a calculator with @calculator
+        self.outcome = "no_data"
         return "No valid numerical data found for required calculation"
-        # Example response for debugging
-        return f"Processed input: {self.input_text}"
+
+    def stats(self):
+        """Intent, calculator, outcome and per-stage seconds of the last processed message.
+
+        Stages ran back to back from started_at (a perf_counter reading) in the
+        order of timings.
+        """
+        intent = self.primary_intent()
+        return {
+            "intent": intent,
+            "calculator": CALCULATORS[intent].handler.__name__ if intent is not None else None,
+            "outcome": self.outcome,
+            "started_at": self.started_at,
+            "timings": dict(self.timings),
+        }
+
+# Phrase automaton over every registered calculator, ranked by priority
+INTENTS = PhraseAutomaton({
+    calc.intent: calc.phrases for calc in sorted(CALCULATORS.values(), key=lambda calc: calc.priority)
+})
+
+def calculator_version():
+    """Digest of everything that decides a result: the backend source, patterns and labels.
+
+    The whole module is hashed, not just the registered handlers, so a change
+    to a helper such as process_required_open_space or LazyMatches.number
+    also retires the results stored under the old version.
+    """
+    digest = hashlib.sha256()
+    try:
+        digest.update(inspect.getsource(sys.modules[__name__]).encode("utf-8"))
+    except (OSError, TypeError):
+        # No source available (e.g. a bytecode-only deploy): fall back to the compiled code
+        for cls in (LazyMatches, KeyValueScanner, BuildingDataProcessor):
+            for name, member in sorted(vars(cls).items()):
+                code = getattr(member, "__code__", None)
+                if code is not None:
+                    digest.update(f"{cls.__name__}.{name}={code.co_code.hex()}{code.co_consts!r}".encode("utf-8"))
+    for key in sorted(PATTERNS):
+        digest.update(f"{key}={PATTERNS[key].pattern}".encode("utf-8"))
+    digest.update(repr(sorted(LABELS.items())).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def result_store_from_env():
+    """Open the shared result store at RESULT_CACHE_DB, or return None when it is unset."""
+    path = os.getenv("RESULT_CACHE_DB")
+    if not path:
+        return None
+    return SQLiteResultStore(
+        path,
+        version=calculator_version(),
+        max_rows=int(os.getenv("RESULT_CACHE_DB_ROWS", 100000)),
+        ttl=float(os.getenv("RESULT_CACHE_DB_TTL", 86400)),
+    )
+
+def result_generation_from_env():
+    """The invalidation marker every process on the node watches, at RESULT_CACHE_GENERATION_FILE.
+
+    Set it empty to keep each process's cache to itself.
+    """
+    path = os.getenv("RESULT_CACHE_GENERATION_FILE", "result_cache.generation")
+    return SharedGeneration(path) if path else None
+
+RESULTS = ResultCache(
+    max_size=int(os.getenv("RESULT_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", 3600)),
+    store=result_store_from_env(),
+    generation=result_generation_from_env(),
+)
+
+_profiler = None
+
+def enable_pattern_profiling():
+    """Start charging every pattern evaluation to a fresh PatternProfiler and return it."""
+    global _profiler
+    _profiler = PatternProfiler(PATTERNS)
+    SCANNER.patterns = BuildingDataProcessor.patterns = _profiler.patterns
+    return _profiler
+
+def disable_pattern_profiling():
+    global _profiler
+    SCANNER.patterns = BuildingDataProcessor.patterns = PATTERNS
+    _profiler = None
+
+def pattern_profiler():
+    """The active PatternProfiler, or None when profiling is off."""
+    return _profiler
+
+_local = threading.local()
+
+def calculate(input_text: str):
+    """Process one message with a processor owned by the calling thread.
+
+    This is the entry point for worker threads and worker processes. Each one
+    keeps its own BuildingDataProcessor, because the processor holds
+    per-message state.
+    """
+    return _processor().process(input_text)
+
+def _processor():
+    processor = getattr(_local, "processor", None)
+    if processor is None:
+        processor = _local.processor = BuildingDataProcessor()
+    return processor
+
+def render_parameters(params):
+    """Render {"label": value} as the "label = value, ..." text the field patterns read."""
+    return ", ".join(f"{label} = {value}" for label, value in params.items())
+
+def calculate_batch(items):
+    """Process (input_text, intent) pairs in order with this thread's processor.
+
+    Returns one (status, response, stats) per item. An item whose calculator
+    raises is reported as ("error", None, None) and the rest carry on.
+    """
+    processor = _processor()
+    results = []
+    for input_text, intent in items:
+        try:
+            response = processor.process(input_text, intent)
+        except Exception as e:
+            logger.error(f"Batch item failed for {input_text!r}: {e}")
+            results.append(("error", None, None))
+        else:
+            results.append(("ok", response, processor.stats()))
+    return results
+
+def calculate_with_stats(input_text: str):
+    """Like calculate(), but return (response, stats) so the caller can record metrics.
+
+    Stats travel back with the result, so they reach the app from worker
+    processes as well as threads. A calculator that raises is re-raised.
+    """
+    processor = _processor()
+    response = processor.process(input_text)
+    return response, processor.stats()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class ExecutorBusy(Exception):
+    """Raised when the calculation queue is already full."""
+
+class CalculationExecutor:
+    """Runs calculations off the event loop on a thread or process pool.
+
+    At most max_pending calls may be running or waiting in the pool at once;
+    further calls fail fast with ExecutorBusy instead of piling up. Each call
+    is bounded by timeout seconds. A call that times out before it starts is
+    dropped from the queue. One that is already running keeps its slot until
+    it finishes, so the bound always reflects the real work in the pool.
+
+    Threads keep the loop responsive but share the GIL. Processes give real
+    parallelism at the cost of pickling each request.
+    """
+    KINDS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_pending: int = 64, timeout: float = 10.0):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown executor kind '{kind}', expected one of: {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._pool = None
+
+    @classmethod
+    def from_env(cls):
+        """Build an executor from the CALC_* environment variables."""
+        return cls(
+            kind=os.getenv("CALC_EXECUTOR", "thread"),
+            workers=int(os.getenv("CALC_WORKERS", min(4, os.cpu_count() or 1))),
+            max_pending=int(os.getenv("CALC_MAX_PENDING", 64)),
+            timeout=float(os.getenv("CALC_TIMEOUT", 10.0)),
+        )
+
+    def start(self):
+        if self._pool is None:
+            self._pool = self.KINDS[self.kind](max_workers=self.workers)
+            logger.info(f"Started {self.kind} calculation executor with {self.workers} workers")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _release(self):
+        self.pending -= 1
+
+    async def submit(self, func, *args):
+        """Run func(*args) in the pool and return its result.
+
+        Raises ExecutorBusy when the queue is full and asyncio.TimeoutError when
+        the call does not finish within the timeout.
+        """
+        if self.pending >= self.max_pending:
+            raise ExecutorBusy(f"{self.pending} calculations already pending")
+        self.start()
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self._pool.submit(func, *args)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+class SingleFlight:
+    """Shares one in-flight computation between identical concurrent requests.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive with the same key before it finishes await that task instead of
+    starting another. Each caller is shielded, so a caller that goes away
+    does not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _finish(self, key, task):
+        self._flights.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller went away
+
+    async def run(self, key, func, *args):
+        """Return the result of func(*args), sharing it with concurrent calls for key."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args))
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"in_flight": len(self._flights), "started_total": self.started, "coalesced_total": self.coalesced}
@@ -0,0 +1,216 @@
+import csv
+import io
+import json
+import logging
+import re
+from itertools import islice
+
+from backend import CALCULATORS, LABELS, PATTERNS, calculate_batch, render_parameters
+
+logger = logging.getLogger(__name__)
+
+# Portfolio ingestion: building inventories in, one answer per credit per row out.
+#
+# Every stage is a generator over rows, so a file of any length is held
+# one chunk at a time: read rows (CSV or JSON lines) -> map columns to
+# parameter keys -> render each row as "label = value" text -> evaluate the
+# requested credits in chunks -> write CSV or JSON lines.
+
+FORMATS = ("csv", "jsonl")
+
+def _key(text: str):
+    return re.sub(r"[\s-]+", "_", text.strip().lower())
+
+def _spelling(variant: str):
+    """The plain text of a LABELS entry, whose "+" and "_" are scanner gap markers."""
+    return variant.replace("+", " ").replace("_", " ")
+
+def _label_keys():
+    keys = {}
+    for key, variants in LABELS.items():
+        for variant in variants:
+            if variant:
+                keys.setdefault(_key(_spelling(variant)), (key, _spelling(variant)))
+    return keys
+
+# (parameter key, label spelling) by lower-cased key and by label, for matching column headers
+_BY_NAME = {key.lower(): (key, _spelling(LABELS[key][0]) if LABELS.get(key) else None) for key in PATTERNS}
+_BY_LABEL = _label_keys()
+
+def map_columns(fieldnames, columns=None):
+    """Return {column: (parameter key, label)} for the columns that name a parameter.
+
+    columns maps a header to a key ("length_width") or to one of its labels
+    ("width"). Otherwise a header matches a key ("dwelling_units") or a
+    label ("number of dwelling units"), ignoring case. The label is the
+    spelling written into the query, so "length" and "width" columns both
+    feed length_width. Other columns are carried through untouched.
+    """
+    columns = columns or {}
+    mapping = {}
+    for column in fieldnames:
+        if column in columns:
+            target = _BY_NAME.get(_key(columns[column])) or _BY_LABEL.get(_key(columns[column]))
+            if target is None:
+                raise ValueError(f"Unknown parameter '{columns[column]}' for column '{column}'")
+        else:
+            target = _BY_NAME.get(_key(column)) or _BY_LABEL.get(_key(column))
+        if target is not None:
+            mapping[column] = target
+    return mapping
+
+def render_row(row, mapping):
+    """Render a row's mapped cells as the text the field patterns read.
+
+    Cells feeding the same key are written next to each other, so a pair
+    like "length = 20 m, width = 10 m" reaches its pattern intact.
+    """
+    cells, free = [], []
+    for column, (key, label) in mapping.items():
+        value = row.get(column)
+        if value is None or isinstance(value, bool) or str(value).strip() == "":
+            continue
+        value = str(value).strip()
+        if label:
+            cells.append((key, label, value))
+        else:
+            # Patterns without a label ("residential", "m^2") match the bare value
+            free.append(value)
+    order = {}
+    for key, _, _ in cells:
+        order.setdefault(key, len(order))
+    cells.sort(key=lambda cell: order[cell[0]])
+    return ", ".join(filter(None, [render_parameters({label: value for _, label, value in cells}), *free]))
+
+def unmatched_spellings():
+    """Keys whose rendered "label = 1 m" is not matched by the key's own pattern.
+
+    Each label is tried on its own. A key none of whose labels match alone
+    (length and width) is tried with all of them together instead.
+    """
+    unmatched = []
+    for key, variants in LABELS.items():
+        labels = [_spelling(variant) for variant in variants if variant]
+        texts = [render_row({label: "1 m"}, {label: (key, label)}) for label in labels]
+        missed = [text for text in texts if not PATTERNS[key].search(text)]
+        if labels and len(missed) == len(labels):
+            together = render_row({label: "1 m" for label in labels}, {label: (key, label) for label in labels})
+            missed = [] if PATTERNS[key].search(together) else [together]
+        unmatched.extend((key, text) for text in missed)
+    return unmatched
+
+# Fail at import rather than answer every row with "Invalid input" when a label and its pattern drift apart
+_UNMATCHED = unmatched_spellings()
+if _UNMATCHED:
+    raise ValueError(f"Label spellings not matched by their patterns: {_UNMATCHED}")
+
+def read_rows(lines, input_format: str = "csv"):
+    """Yield one dict per row from an iterable of text lines; JSON lines that are not objects are skipped."""
+    if input_format == "csv":
+        for row in csv.DictReader(lines):
+            row.pop(None, None)  # cells beyond the header
+            yield row
+    elif input_format == "jsonl":
+        for number, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                if isinstance(row, dict):
+                    yield row
+                else:
+                    logger.warning(f"Skipping line {number}: not a JSON object")
+    else:
+        raise ValueError(f"input format must be one of {', '.join(FORMATS)}")
+
+def _calculate(entries):
+    return [(status, response) for status, response, _ in calculate_batch(entries)]
+
+def evaluate_rows(rows, credits, columns=None, chunk_size: int = 200, evaluate=_calculate):
+    """Yield (row, {credit: answer}) for each row, evaluating chunk_size rows per batch.
+
+    Each row is mapped by its own fields, since JSON lines may leave some
+    out; the mapping is worked out once per distinct set of fields.
+    evaluate takes a list of (text, credit) entries and returns one
+    (status, response) per entry; by default they are calculated in place.
+    """
+    mappings = {}
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        texts = []
+        for row in chunk:
+            fields = tuple(row)
+            if fields not in mappings:
+                if len(mappings) >= 1024:
+                    mappings.clear()  # rows with ever-changing fields should not grow this without bound
+                mappings[fields] = map_columns(fields, columns)
+                logger.debug("Ingest column mapping: %s", mappings[fields])
+            texts.append(render_row(row, mappings[fields]))
+        outcomes = iter(evaluate([(text, credit) for text in texts for credit in credits]))
+        for row in chunk:
+            answers = {}
+            for credit in credits:
+                status, response = next(outcomes)
+                answers[credit] = response if status == "ok" else "The calculation failed. Please check the input and try again."
+            yield row, answers
+
+def write_csv(results, credits):
+    """Yield CSV text: the input columns followed by one column per credit.
+
+    The header is taken from the first row. For JSON lines input, fields that
+    first appear in a later row are left out of the CSV (they were still used
+    in the calculation); ask for JSON lines output to keep every field.
+    """
+    buffer = io.StringIO()
+    writer = None
+    for row, answers in results:
+        if writer is None:
+            writer = csv.DictWriter(buffer, [*row, *(credit for credit in credits if credit not in row)], extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({**row, **answers})
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def write_jsonl(results, credits):
+    """Yield one JSON object per row: the input fields plus one field per credit."""
+    lines = []
+    for row, answers in results:
+        lines.append(json.dumps({**row, **answers}, ensure_ascii=False) + "\n")
+        if len(lines) >= 500:
+            yield "".join(lines)
+            lines.clear()
+    if lines:
+        yield "".join(lines)
+
+def ingest(lines, credits, input_format: str = "csv", output_format: str = "csv", columns=None, chunk_size: int = 200,
+           evaluate=_calculate):
+    """Stream a building inventory through the calculators.
+
+    lines is any iterable of text lines (an open file, a request body);
+    credits names the calculators to run on every row. Yields the output
+    as CSV or JSON lines text, chunk by chunk. evaluate is as for
+    evaluate_rows.
+    """
+    credits = list(credits)
+    unknown = [credit for credit in credits if credit not in CALCULATORS]
+    if unknown or not credits:
+        raise ValueError(f"Unknown credit(s): {', '.join(unknown) or 'none given'}. Choose from: {', '.join(CALCULATORS)}")
+    if input_format not in FORMATS or output_format not in FORMATS:
+        raise ValueError(f"Formats must be one of {', '.join(FORMATS)}")
+    map_columns(list(columns or {}), columns)  # an unknown parameter in columns fails here, not mid-stream
+    results = evaluate_rows(read_rows(lines, input_format), credits, columns, chunk_size, evaluate)
+    writer = write_csv if output_format == "csv" else write_jsonl
+    return writer(results, credits)
+
+if __name__ == "__main__":
+    # e.g. python ingest.py seer,far < inventory.csv > results.csv
+    import sys
+    for text in ingest(sys.stdin, sys.argv[1].split(","), *sys.argv[2:4]):
+        sys.stdout.write(text)
@@ -0,0 +1,308 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Array versions of the calculator formulas in backend.py, for evaluating
+# thousands of input combinations at once (what-if sweeps, goal seeking).
+#
+# Every kernel takes one array (or scalar) per parameter, broadcasts them
+# together and returns a float64 array holding exactly the number the
+# matching process_* method would print. Where the scalar path would not
+# produce a number (a division by zero, a zero it rejects with a message,
+# an overflow) the result is NaN.
+
+Kernel = namedtuple("Kernel", "name intent params unit func")
+
+KERNELS = {}  # kernel name -> Kernel
+
+# numpy's exp may differ from math.exp in the last bit or two. A result this
+# close (relative to its magnitude) to a rounding boundary is recomputed with
+# the scalar formula, so it rounds exactly as the calculator would.
+_SLACK = 1e-9
+
+# Beyond this, rint(x * 100) / 100 no longer reproduces round(x, 2)
+_ROUND_LIMIT = 1e13
+
+def kernel(name: str, intent: str, params, unit: str = "", scalar=None):
+    """Register an array formula under name.
+
+    scalar is the same formula written with math, for elements the array
+    version flags as too close to a rounding boundary to trust.
+    """
+    def register(func):
+        def evaluate(*arrays):
+            if len(arrays) != len(params):
+                raise TypeError(f"{name} takes {len(params)} arrays ({', '.join(params)}), got {len(arrays)}")
+            arrays = np.broadcast_arrays(*(np.asarray(array, dtype=np.float64) for array in arrays))
+            with np.errstate(all="ignore"):
+                result = func(*arrays)
+            if scalar is not None:
+                result, unsure = result
+                for index in np.flatnonzero(unsure):
+                    result.flat[index] = _scalar(scalar, *(array.flat[index] for array in arrays))
+            return result
+        evaluate.__name__ = func.__name__
+        evaluate.__doc__ = func.__doc__
+        KERNELS[name] = Kernel(name, intent, tuple(params), unit, evaluate)
+        return evaluate
+    return register
+
+def evaluate(name: str, **arrays):
+    """Run the kernel called name with its parameters given by keyword."""
+    spec = KERNELS.get(name)
+    if spec is None:
+        raise KeyError(f"Unknown kernel '{name}'")
+    missing = [param for param in spec.params if param not in arrays]
+    if missing or len(arrays) != len(spec.params):
+        raise TypeError(f"{name} takes {', '.join(spec.params)}")
+    return spec.func(*(arrays[param] for param in spec.params))
+
+def _scalar(formula, *values):
+    try:
+        return float(formula(*(float(value) for value in values)))
+    except (ArithmeticError, ValueError):
+        return math.nan
+
+def _ceil(values):
+    """math.ceil over an array, with NaN where math.ceil would raise (inf or NaN)."""
+    return np.where(np.isfinite(values), np.ceil(values), np.nan)
+
+def _nonzero(values):
+    """NaN where the calculator answers a zero with a message instead of a number."""
+    return np.where(values == 0, np.nan, values)
+
+def _whole(values):
+    """NaN unless a finite whole number, for fields the calculator parses with int()."""
+    return np.where(np.isfinite(values) & (values == np.floor(values)), values, np.nan)
+
+def _decay(fmin, fmax, k, t):
+    """fmin + (fmax - fmin) * e^(-kt), with the slack to allow for numpy's exp."""
+    decayed = (fmax - fmin) * np.exp(-k * t)
+    values = fmin + decayed
+    return values, _SLACK * (np.abs(fmin) + np.abs(decayed))
+
+def _near_integer(values, slack):
+    # Non-finite values are rechecked too: exp may overflow at a slightly different point
+    return (np.abs(values - np.rint(values)) <= slack) | ~np.isfinite(values)
+
+# Long-term bicycle storage
+
+@kernel("long_term_storage_residential", "long_term_storage", ("occupants", "dwelling_units"), "bicycles")
+def long_term_storage_residential(occupants, dwelling_units):
+    return np.maximum(_ceil(occupants * 0.30), _ceil(dwelling_units))
+
+@kernel("long_term_storage_commercial", "long_term_storage", ("occupants",), "bicycles")
+def long_term_storage_commercial(occupants):
+    """Commercial and institutional buildings."""
+    return _ceil(occupants * 0.05)
+
+# Short-term bicycle storage
+
+@kernel("short_term_storage_visitors", "short_term_storage", ("peak_visitors",), "bicycles")
+def short_term_storage_visitors(peak_visitors):
+    return _ceil(peak_visitors * 0.025)
+
+@kernel("short_term_storage_area_ft", "short_term_storage", ("area",), "bicycles")
+def short_term_storage_area_ft(area):
+    return _ceil(2 * (area / 5000))
+
+@kernel("short_term_storage_area_m", "short_term_storage", ("area",), "bicycles")
+def short_term_storage_area_m(area):
+    return _ceil(2 * (area / 465))
+
+@kernel("shower_facilities", "shower_facilities", ("occupants",), "showers")
+def shower_facilities(occupants):
+    return np.where(occupants <= 100, 1.0, _ceil((1 + (occupants - 100)) / 150))
+
+# Parking
+
+@kernel("preferred_spaces", "preferred_spaces", ("total_parking_spaces",), "spaces")
+def preferred_spaces(total_parking_spaces):
+    return _ceil(total_parking_spaces * 0.05)
+
+@kernel("fueling_stations", "fueling_stations", ("total_parking_spaces",), "stations")
+def fueling_stations(total_parking_spaces):
+    return _ceil(total_parking_spaces * 0.02)
+
+# Site
+
+@kernel("restoration_area", "restoration_area", ("restoration_area", "disturbed_area"), "%")
+def restoration_area(restoration_area, disturbed_area):
+    return _ceil((restoration_area / disturbed_area) * 100)
+
+@kernel("open_space", "open_space", ("total_site_area",), "%")
+def open_space(total_site_area):
+    return _nonzero(_ceil(total_site_area * 0.30))
+
+@kernel("vegetated_space", "vegetated_space", ("required_open_space",), "%")
+def vegetated_space(required_open_space):
+    return _ceil(_nonzero(required_open_space) * 0.25)
+
+@kernel("vegetated_space_from_site", "vegetated_space", ("total_site_area",), "%")
+def vegetated_space_from_site(total_site_area):
+    return _ceil(open_space(total_site_area) * 0.25)
+
+@kernel("outdoor_area_m", "outdoor_area", ("peak_inpatients", "qualifying_outpatients"), "m²")
+def outdoor_area_m(peak_inpatients, qualifying_outpatients):
+    return _ceil(0.5 * (0.75 * peak_inpatients) + 0.5 * (0.75 * qualifying_outpatients))
+
+@kernel("outdoor_area_ft", "outdoor_area", ("peak_inpatients", "qualifying_outpatients"), "ft²")
+def outdoor_area_ft(peak_inpatients, qualifying_outpatients):
+    return _ceil(5 * (0.75 * peak_inpatients) + 5 * (0.75 * qualifying_outpatients))
+
+@kernel("development_percentage", "development_percentage", ("previously_developed_land", "development_footprint"), "%")
+def development_percentage(previously_developed_land, development_footprint):
+    return _ceil(100 * (previously_developed_land / development_footprint))
+
+# Flush-out air volumes; area is length * width when given that way
+
+@kernel("air_volume_before_occupancy_ft", "air_volume_before_occupancy", ("area",), "ft³")
+def air_volume_before_occupancy_ft(area):
+    return _ceil(area * 14000)
+
+@kernel("air_volume_before_occupancy_m", "air_volume_before_occupancy", ("area",), "l")
+def air_volume_before_occupancy_m(area):
+    return _ceil(area * 4267140)
+
+@kernel("air_volume_during_occupancy_ft", "air_volume_during_occupancy", ("area",), "ft³")
+def air_volume_during_occupancy_ft(area):
+    return _ceil(area * 3500)
+
+@kernel("air_volume_during_occupancy_m", "air_volume_during_occupancy", ("area",), "l")
+def air_volume_during_occupancy_m(area):
+    return _ceil(area * 1066260)
+
+@kernel("air_volume_to_complete_ft", "air_volume_to_complete", ("area",), "ft³")
+def air_volume_to_complete_ft(area):
+    return _ceil(area * 10500)
+
+@kernel("air_volume_to_complete_m", "air_volume_to_complete", ("area",), "l")
+def air_volume_to_complete_m(area):
+    return _ceil(area * 3200880)
+
+# Stormwater (Horton)
+
+def _depression_storage(fmin, fmax, k, t):
+    return math.ceil(fmin + (fmax - fmin) * math.exp(-k * t))
+
+@kernel("depression_storage", "Depression storage", ("fmin", "fmax", "k", "t"), "mm/hr", scalar=_depression_storage)
+def depression_storage(fmin, fmax, k, t):
+    values, slack = _decay(fmin, fmax, k, t)
+    return _ceil(values), _near_integer(values, slack)
+
+@kernel("runoff", "Runoff", ("rainfall", "depression_storage", "infiltration"), "mm/hr")
+def runoff(rainfall, depression_storage, infiltration):
+    return _ceil(rainfall - depression_storage - infiltration)
+
+def _runoff_from_decay(rainfall, infiltration, fmin, fmax, k, t):
+    depression_storage = round(fmin + (fmax - fmin) * math.exp(-k * t), 2)
+    return math.ceil(rainfall - depression_storage - infiltration)
+
+@kernel("runoff_from_decay", "Runoff", ("rainfall", "infiltration", "fmin", "fmax", "k", "t"), "mm/hr", scalar=_runoff_from_decay)
+def runoff_from_decay(rainfall, infiltration, fmin, fmax, k, t):
+    """Runoff with depression storage worked out from fmin, fmax, k and t."""
+    values, slack = _decay(fmin, fmax, k, t)
+    # round(x, 2) is decided on the exact decimal value of x; flag halves
+    # that float rounding in x * 100 or exp could tip either way
+    scaled = values * 100
+    unsure = (np.abs(scaled - np.floor(scaled) - 0.5) <= 100 * slack + _SLACK * np.abs(scaled)) | ~(np.abs(values) < _ROUND_LIMIT)
+    depression_storage = np.rint(scaled) / 100
+    return _ceil(rainfall - depression_storage - infiltration), unsure
+
+# Bicycle racks
+
+@kernel("bicycle_racks_long_term", "bicycle_racks", ("occupants",), "racks")
+def bicycle_racks_long_term(occupants):
+    return _ceil(occupants / 20)
+
+@kernel("bicycle_racks_short_term", "bicycle_racks", ("area",), "racks")
+def bicycle_racks_short_term(area):
+    return _ceil(area / 500)
+
+# Energy
+
+@kernel("energy_performance", "energy_performance", ("baseline_energy", "proposed_energy"), "%")
+def energy_performance(baseline_energy, proposed_energy):
+    return _ceil(((baseline_energy - proposed_energy) / baseline_energy) * 100)
+
+@kernel("r_value", "r_value", ("material_thickness", "thermal_conductivity"), "m²·K/W")
+def r_value(material_thickness, thermal_conductivity):
+    return _ceil(material_thickness / thermal_conductivity)
+
+@kernel("u_value", "u_value", ("r_value",), "W/m²·K")
+def u_value(r_value):
+    return _ceil(1 / r_value)
+
+@kernel("u_value_from_material", "u_value", ("material_thickness", "thermal_conductivity"), "W/m²·K")
+def u_value_from_material(material_thickness, thermal_conductivity):
+    return _ceil(1 / r_value(material_thickness, thermal_conductivity))
+
+@kernel("shw", "shw", ("shw_generated", "hot_water_demand"), "%")
+def shw(shw_generated, hot_water_demand):
+    return _ceil((shw_generated / hot_water_demand) * 100)
+
+@kernel("renewable_energy", "renewable_energy", ("energy_generated", "energy_consumption"), "%")
+def renewable_energy(energy_generated, energy_consumption):
+    """PV share of the building's energy, or renewable share of the community's."""
+    return _ceil((energy_generated / energy_consumption) * 100)
+
+@kernel("seer", "seer", ("cooling_provided", "energy_consumed"), "%")
+def seer(cooling_provided, energy_consumed):
+    return _ceil((cooling_provided / energy_consumed) * 100)
+
+# Occupancy and outdoor space
+
+@kernel("occupant_density", "occupant_density", ("occupancy", "area"), "people/m²")
+def occupant_density(occupancy, area):
+    return _ceil(occupancy / area)
+
+@kernel("size_of_outdoor_space", "size_of_outdoor_space", ("total_occupancy",), "m²")
+def size_of_outdoor_space(total_occupancy):
+    return _ceil(total_occupancy * 0.25)
+
+@kernel("dwelling_private_space", "dwelling_building_size", ("occupants",), "m²")
+def dwelling_private_space(occupants):
+    occupants = _whole(occupants)
+    return np.where(occupants <= 2, 5.0, occupants + 3)
+
+@kernel("dwelling_communal_space", "dwelling_building_size", ("total_occupancy",), "m²")
+def dwelling_communal_space(total_occupancy):
+    return _ceil(_whole(total_occupancy) * 0.25)
+
+# Materials and waste
+
+@kernel("adhesives_sealants", "adhesives_sealants_intent", ("weight_compliant", "total_weight"), "%")
+def adhesives_sealants(weight_compliant, total_weight):
+    return _ceil((weight_compliant / total_weight) * 100)
+
+@kernel("compliant_paints", "compliant_paints", ("weight_compliant", "total_weight"), "%")
+def compliant_paints(weight_compliant, total_weight):
+    return _ceil((weight_compliant / total_weight) * 100)
+
+@kernel("waste_diverted", "waste_diverted_intent", ("waste_diverted", "total_waste"), "%")
+def waste_diverted(waste_diverted, total_waste):
+    return _ceil((waste_diverted / total_waste) * 100)
+
+# Neighbourhood
+
+@kernel("connectivity_index", "connectivity_index_intent", ("street_links", "nodes"))
+def connectivity_index(street_links, nodes):
+    return _ceil(_whole(street_links) / _whole(nodes))
+
+@kernel("intersection_density", "intersection_density_intent", ("intersections", "area"), "intersections/m²")
+def intersection_density(intersections, area):
+    return _ceil(_whole(intersections) / area)
+
+@kernel("intersection_density_ft", "intersection_density_intent", ("intersections", "area"), "intersections/m²")
+def intersection_density_ft(intersections, area):
+    """Area given in ft², converted to m² as the calculator does."""
+    return _ceil(_whole(intersections) / (area / 10.764))
+
+@kernel("continuous_walkway", "continuous_walkway_intent", ("continuous_walkway_length", "all_walkways_length"), "%")
+def continuous_walkway(continuous_walkway_length, all_walkways_length):
+    return _ceil((continuous_walkway_length / all_walkways_length) * 100)
+
+@kernel("far", "far", ("gross_floor_area", "site_area"), "%")
+def far(gross_floor_area, site_area):
+    return _ceil((gross_floor_area / site_area) * 100)
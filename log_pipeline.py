@@ -0,0 +1,184 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+
+class SampleFilter(logging.Filter):
+    """Keeps every record above DEBUG and a random fraction rate of DEBUG records."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+# Session tokens in query strings, e.g. the "WebSocket /ws?token=..." lines uvicorn logs
+TOKEN_PATTERN = re.compile(r"([?&]token=)[^&\s\"]+")
+
+class RedactTokenFilter(logging.Filter):
+    """Replaces token=... query parameters in a record's message and arguments."""
+
+    def filter(self, record):
+        if isinstance(record.msg, str):
+            record.msg = TOKEN_PATTERN.sub(r"\1[redacted]", record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(TOKEN_PATTERN.sub(r"\1[redacted]", arg) if isinstance(arg, str) else arg for arg in record.args)
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them or waiting for room.
+
+    Records are queued as they are, so message formatting happens on the
+    writer thread. When the queue is full the record is dropped and counted
+    rather than stalling the caller.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchWriter:
+    """Background thread that drains the log queue and writes records in batches.
+
+    Each batch of up to batch_size records is formatted and written with a
+    single write and flush. formatter only needs a format(record) method, so
+    the writer also serves non-logging streams such as trace files.
+    """
+    _STOP = object()
+
+    def __init__(self, queue, stream, formatter, batch_size: int = 256):
+        self.queue = queue
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.written = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put(self._STOP)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._STOP in batch
+            self._write([record for record in batch if record is not self._STOP])
+            if stop:
+                return
+
+    def _write(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(f"Unformattable record: {record!r}")
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            return
+        self.written += len(lines)
+
+def parse_levels(spec: str):
+    """Parse 'app.ws=DEBUG,backend=WARNING' into {logger name: level}."""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_handler = None
+_writer = None
+
+def _start_writer(queue_size: int, stream, formatter: logging.Formatter, batch_size: int):
+    global _writer
+    _handler.queue = queue.Queue(maxsize=queue_size)
+    _writer = BatchWriter(_handler.queue, stream, formatter, batch_size)
+    _writer.start()
+
+def configure_logging():
+    """Route all logging through a queue drained by a background writer thread.
+
+    Configured by LOG_LEVEL (root level, INFO), LOG_LEVELS (per-subsystem
+    levels, e.g. 'app.ws=DEBUG,backend=WARNING'), LOG_DEBUG_SAMPLE (fraction
+    of DEBUG records kept, 1.0), LOG_QUEUE_SIZE (records buffered before new
+    ones are dropped, 10000), LOG_BATCH_SIZE (256) and LOG_FILE (stderr if
+    unset). Calling it again has no effect.
+    """
+    global _handler
+    if _handler is not None:
+        return
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    path = os.getenv("LOG_FILE")
+    stream = open(path, "a", encoding="utf-8") if path else sys.stderr
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    queue_size = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    batch_size = int(os.getenv("LOG_BATCH_SIZE", 256))
+
+    _handler = NonBlockingQueueHandler(None)
+    _handler.addFilter(SampleFilter(float(os.getenv("LOG_DEBUG_SAMPLE", 1.0))))
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_handler)
+    # uvicorn writes these through its own handlers, so filter at the loggers
+    for name in ("uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).addFilter(RedactTokenFilter())
+    _start_writer(queue_size, stream, formatter, batch_size)
+    atexit.register(shutdown_logging)
+    # Worker processes forked by the process executor need a writer of their own
+    os.register_at_fork(after_in_child=lambda: _start_writer(queue_size, stream, formatter, batch_size))
+
+def shutdown_logging():
+    """Write out everything still queued and stop the writer thread."""
+    if _writer is not None:
+        _writer.stop()
+
+def logging_stats():
+    if _handler is None:
+        return {}
+    sampled_out = sum(f.dropped for f in _handler.filters if isinstance(f, SampleFilter))
+    return {
+        "queued": _handler.queue.qsize(),
+        "written_total": _writer.written,
+        "dropped_total": _handler.dropped,
+        "sampled_out_total": sampled_out,
+    }
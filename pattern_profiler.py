@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from types import MappingProxyType
+
+class PatternStats:
+    __slots__ = ("calls", "hits", "repeats", "total", "worst", "consumers")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.repeats = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.consumers = Counter()
+
+class ProfiledPattern:
+    """Stands in for a compiled pattern and reports every search/match to the profiler."""
+    __slots__ = ("key", "compiled", "profiler")
+
+    def __init__(self, key: str, compiled, profiler):
+        self.key = key
+        self.compiled = compiled
+        self.profiler = profiler
+
+    @property
+    def pattern(self):
+        return self.compiled.pattern
+
+    def search(self, *args):
+        started = time.perf_counter()
+        match = self.compiled.search(*args)
+        self.profiler.record(self.key, time.perf_counter() - started, match is not None)
+        return match
+
+    def match(self, *args):
+        started = time.perf_counter()
+        match = self.compiled.match(*args)
+        self.profiler.record(self.key, time.perf_counter() - started, match is not None)
+        return match
+
+class PatternProfiler:
+    """Per-pattern timings, hit rates and consumers across real traffic.
+
+    patterns is a drop-in replacement for the compiled catalog. begin() marks
+    the start of a message and names the calculator it was routed to, so
+    every pattern evaluated for that message is charged to it. A pattern
+    evaluated again within the same message counts as a repeat, which points
+    at a calculator re-searching a field that was already extracted.
+    """
+
+    def __init__(self, patterns):
+        self.compiled = patterns
+        self.patterns = MappingProxyType({key: ProfiledPattern(key, compiled, self) for key, compiled in patterns.items()})
+        self.stats = {key: PatternStats() for key in patterns}
+        self.messages = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._context = threading.local()
+
+    def begin(self, consumer: str):
+        self._context.consumer = consumer
+        self._context.seen = set()
+        with self._lock:
+            self.messages += 1
+
+    def record(self, key: str, seconds: float, hit: bool):
+        consumer = getattr(self._context, "consumer", None) or "none"
+        seen = getattr(self._context, "seen", None)
+        repeat = seen is not None and key in seen
+        if seen is not None:
+            seen.add(key)
+        with self._lock:
+            stats = self.stats[key]
+            stats.calls += 1
+            stats.total += seconds
+            if seconds > stats.worst:
+                stats.worst = seconds
+            if hit:
+                stats.hits += 1
+                stats.consumers[consumer] += 1
+            if repeat:
+                stats.repeats += 1
+
+    def duplicates(self):
+        """Groups of keys whose patterns have identical source."""
+        by_source = defaultdict(list)
+        for key, compiled in self.compiled.items():
+            by_source[(compiled.pattern, compiled.flags)].append(key)
+        return [keys for keys in by_source.values() if len(keys) > 1]
+
+    def report(self, top: int = 10):
+        """Summary of the profile, with the hot, dead, repeated and duplicated patterns called out."""
+        with self._lock:
+            rows = [
+                {
+                    "key": key,
+                    "calls": stats.calls,
+                    "hits": stats.hits,
+                    "hit_rate": round(stats.hits / stats.calls, 4) if stats.calls else 0.0,
+                    "repeats": stats.repeats,
+                    "total_ms": round(stats.total * 1000, 3),
+                    "mean_us": round(stats.total / stats.calls * 1e6, 2) if stats.calls else 0.0,
+                    "worst_us": round(stats.worst * 1e6, 2),
+                    "consumers": dict(stats.consumers.most_common()),
+                }
+                for key, stats in self.stats.items()
+            ]
+            messages = self.messages
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        total_ms = sum(row["total_ms"] for row in rows)
+        return {
+            "messages": messages,
+            "since": self.started,
+            "total_ms": round(total_ms, 3),
+            "hot": [row["key"] for row in rows[:top] if row["calls"]],
+            "never_called": sorted(row["key"] for row in rows if not row["calls"]),
+            "never_matched": sorted(row["key"] for row in rows if row["calls"] and not row["hits"]),
+            "repeated": sorted((row["key"] for row in rows if row["repeats"]), key=lambda key: -self.stats[key].repeats),
+            "duplicates": self.duplicates(),
+            "patterns": rows,
+        }
+
+def format_report(report, limit: int = 25):
+    """Render report() as a plain-text table for the console."""
+    lines = [
+        f"{report['messages']} messages, {report['total_ms']:.1f} ms in patterns",
+        f"{'pattern':<32}{'calls':>8}{'hit%':>7}{'repeats':>9}{'total ms':>10}{'mean us':>9}{'worst us':>10}  consumers",
+    ]
+    for row in report["patterns"][:limit]:
+        consumers = ", ".join(f"{name}={count}" for name, count in list(row["consumers"].items())[:3])
+        lines.append(
+            f"{row['key']:<32}{row['calls']:>8}{row['hit_rate'] * 100:>6.1f}%{row['repeats']:>9}"
+            f"{row['total_ms']:>10.2f}{row['mean_us']:>9.1f}{row['worst_us']:>10.1f}  {consumers}"
+        )
+    for title, key in (("Never called", "never_called"), ("Never matched", "never_matched"), ("Re-searched within a message", "repeated")):
+        lines.append(f"{title}: {', '.join(report[key]) or '-'}")
+    lines.append(f"Identical sources: {'; '.join(' = '.join(keys) for keys in report['duplicates']) or '-'}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # Replay captured queries, one per line, e.g. python pattern_profiler.py queries.txt
+    import fileinput
+    import backend
+    profiler = backend.enable_pattern_profiling()
+    for line in fileinput.input():
+        if line.strip():
+            try:
+                backend.calculate(line.strip())
+            except Exception:
+                pass
+    print(format_report(profiler.report()))
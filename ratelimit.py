@@ -0,0 +1,150 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def parse_rate(spec: str):
+    """Parse a '<calls>/<seconds>' spec such as '10/60' into (calls, seconds)."""
+    calls, _, seconds = spec.partition("/")
+    return int(calls), float(seconds or 60)
+
+class TokenBucket:
+    """A single token bucket holding up to capacity tokens, refilled at rate tokens per second."""
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float = None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, cost: float = 1.0, now: float = None):
+        """Consume cost tokens; return 0 on success, otherwise the seconds until they are available.
+
+        A cost above capacity is allowed from a full bucket and leaves it in
+        debt, so later calls wait until the whole cost has been refilled.
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+class MemoryBucketStore:
+    """Buckets kept in this process, evicting the least recently used beyond max_keys."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(capacity, rate)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take()
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, so every worker process on a node shares the same limits.
+
+    Calls block on the file lock (up to the 5 s busy timeout), so call take()
+    from a worker thread. A bucket that has refilled completely is the same as
+    no row at all, so rows past their full_at time are deleted at most once
+    per prune_interval seconds; otherwise keys built from attacker-chosen
+    usernames would grow the table without bound.
+    """
+
+    def __init__(self, path: str, prune_interval: float = 60.0):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._pruned = 0.0
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL, full_at REAL)"
+            )
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(buckets)")]
+            if "full_at" not in columns:
+                connection.execute("ALTER TABLE buckets ADD COLUMN full_at REAL")
+            connection.execute("CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at)")
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, capacity: float, rate: float):
+        connection = self._connect()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            retry_after = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not retry_after:
+                tokens -= 1
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            if now - self._pruned >= self.prune_interval:
+                self._pruned = now
+                self._prune(connection, now)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def _prune(self, connection, now: float):
+        # Rows written before full_at existed have it NULL; they are long refilled
+        deleted = connection.execute("DELETE FROM buckets WHERE full_at IS NULL OR full_at < ?", (now,)).rowcount
+        if deleted:
+            logger.debug("Pruned %s full rate limit buckets", deleted)
+
+def bucket_store_from_env():
+    """Pick the bucket store named by RATE_LIMIT_BACKEND ('memory' or 'sqlite')."""
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteBucketStore(os.getenv("RATE_LIMIT_DB", "ratelimit.sqlite3"))
+    if backend != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{backend}', using memory")
+    return MemoryBucketStore()
+
+class RateLimiter:
+    """Allows a burst of capacity calls per key, refilled evenly over period seconds."""
+
+    def __init__(self, name: str, capacity: int, period: float, store=None):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.store = store or MemoryBucketStore()
+        self.rejected = 0
+
+    @classmethod
+    def from_spec(cls, name: str, spec: str, store=None):
+        """Build a limiter from a '<calls>/<seconds>' spec such as '10/60'."""
+        calls, seconds = parse_rate(spec)
+        return cls(name, calls, seconds, store)
+
+    def check(self, key: str):
+        """Charge one call to key; return 0 if allowed, otherwise the seconds to wait."""
+        retry_after = self.store.take(f"{self.name}:{key}", self.capacity, self.rate)
+        if retry_after:
+            self.rejected += 1
+        return retry_after
@@ -0,0 +1,101 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+from fastapi import Request, Response
+
+try:
+    import brotli  # In requirements.txt; without it the page is served as gzip or identity only
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def accepted_encodings(header: str):
+    """Parse an Accept-Encoding header into {coding: q}."""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+class StaticPage:
+    """A file served from memory with precompressed variants and strong ETags.
+
+    The file is read and compressed once. Each content coding gets its own
+    ETag, so a revalidating client receives 304 without the body being
+    touched. reload_if_changed() and watch() pick up edits without a restart.
+    """
+    PREFERRED_ENCODINGS = ("br", "gzip")
+
+    def __init__(self, path: str, media_type: str = "text/html; charset=utf-8", cache_control: str = "no-cache"):
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.mtime = None
+        self.variants = {}
+        self.load()
+
+    def load(self):
+        with open(self.path, "rb") as file:
+            body = file.read()
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {"identity": (body, f'"{digest}"')}
+        variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+        if brotli is not None:
+            variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+        self.mtime = os.stat(self.path).st_mtime_ns
+        self.variants = variants  # Swapped in whole so readers never see a partial update
+        logger.info(f"Loaded {self.path} ({len(body)} bytes, variants: {', '.join(variants)})")
+
+    def reload_if_changed(self):
+        """Reload the file if its modification time changed; return True if it did."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Cannot stat {self.path}: {e}")
+            return False
+        if mtime == self.mtime:
+            return False
+        self.load()
+        return True
+
+    async def watch(self, interval: float = 2.0):
+        """Poll the file and reload it when it changes, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except OSError as e:
+                logger.error(f"Failed to reload {self.path}: {e}")
+
+    def select_encoding(self, accept_encoding: str):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in self.PREFERRED_ENCODINGS:
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return "identity"
+
+    def response(self, request: Request):
+        encoding = self.select_encoding(request.headers.get("accept-encoding", ""))
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in tags or etag in tags or f"W/{etag}" in tags:
+                return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,247 @@
+import json
+import math
+import re
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+
+from kernels import KERNELS
+
+# What-if sweeps: one kernel evaluated over every combination of its inputs.
+#
+# Each input is a single value, an inclusive range "20..80 step 5" (step 1
+# when omitted) or a list of values. The grid is never materialized: a
+# chunk of flat indices is unravelled into per-input values, evaluated in
+# one kernel call and turned into rows, so memory stays at one chunk
+# however large the grid. goal_seek() searches the same kind of grid the
+# other way round, for the input that brings the result to a target.
+
+class SweepTooLarge(ValueError):
+    """The grid has more points than the configured limit."""
+
+RANGE_PATTERN = re.compile(r"^\s*(\S+)\s*\.\.\s*(\S+?)(?:\s+step\s+(\S+))?\s*$", re.IGNORECASE)
+OPEN_RANGE_PATTERN = re.compile(r"^\s*(\S+?)\s*\.\.(?:\s+step\s+(\S+))?\s*$", re.IGNORECASE)
+
+# Range values are whole numbers of units, exact in float64 below 2^53
+EXACT_UNITS = 2 ** 53
+
+class Axis:
+    """The values one input takes, generated on demand by index.
+
+    Ranges are kept as whole numbers of 10^-places so that value i is
+    exactly the float of its decimal text (20..21 step 0.1 gives 20.3,
+    not 20.299999999999997), with no drift however long the range.
+    """
+    __slots__ = ("name", "size", "_values", "_start", "_step", "_scale")
+
+    def __init__(self, name: str, values=None, start: int = 0, step: int = 0, size: int = 0, places: int = 0):
+        self.name = name
+        self._values = None if values is None else np.asarray(values, dtype=np.float64)
+        self.size = len(self._values) if values is not None else size
+        self._start = start
+        self._step = step
+        self._scale = 10 ** places
+
+    @classmethod
+    def parse(cls, name: str, spec):
+        """Build an axis from a number, a list of numbers or a "start..stop [step s]" string."""
+        if isinstance(spec, (list, tuple)):
+            if not spec:
+                raise ValueError(f"'{name}' has no values")
+            return cls(name, values=[_number(name, value) for value in spec])
+        if not isinstance(spec, str):
+            return cls(name, values=[_number(name, spec)])
+        match = RANGE_PATTERN.match(spec)
+        if not match:
+            return cls(name, values=[_number(name, spec)])
+        start, stop = _decimal(name, match[1]), _decimal(name, match[2])
+        if stop < start:
+            raise ValueError(f"The range for '{name}' ends before it starts")
+        return cls._range(name, start, stop, _decimal(name, match[3]) if match[3] else Decimal(1))
+
+    @classmethod
+    def parse_open(cls, name: str, spec: str):
+        """Like parse(), but "start.. [step s]" runs as far as the values stay exact."""
+        match = OPEN_RANGE_PATTERN.match(spec or "0..")
+        if not match:
+            return cls.parse(name, spec)
+        return cls._range(name, _decimal(name, match[1]), None, _decimal(name, match[2]) if match[2] else Decimal(1))
+
+    @classmethod
+    def _range(cls, name: str, start, stop, step):
+        if step <= 0:
+            raise ValueError(f"The step for '{name}' must be positive")
+        places = max(0, *(-value.as_tuple().exponent for value in (start, step, stop or start)))
+        scale = Decimal(10) ** places
+        start_units, step_units = int(start * scale), int(step * scale)
+        stop_units = int(stop * scale) if stop is not None else EXACT_UNITS - 1
+        if max(abs(start_units), abs(stop_units)) >= EXACT_UNITS:
+            raise ValueError(f"The range for '{name}' has too many digits")
+        return cls(name, start=start_units, step=step_units, size=(stop_units - start_units) // step_units + 1, places=places)
+
+    def take(self, indices):
+        if self._values is not None:
+            return self._values[indices]
+        return (self._start + indices * self._step).astype(np.float64) / self._scale
+
+def _decimal(name: str, text: str):
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid number for '{name}': {text!r}") from None
+    if not value.is_finite():
+        raise ValueError(f"Invalid number for '{name}': {text!r}")
+    return value
+
+def _number(name: str, value):
+    if isinstance(value, str):
+        return float(_decimal(name, value.strip()))
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"Invalid number for '{name}': {value!r}")
+    return float(value)
+
+def _key(text: str):
+    return re.sub(r"[\s-]+", "_", text.strip().lower())
+
+def resolve_kernel(name: str, inputs):
+    """Find the kernel for name (a kernel or calculator name) that takes exactly these inputs."""
+    key = _key(name)
+    candidates = [spec for spec in KERNELS.values() if key in (spec.name, _key(spec.intent)) or spec.name.startswith(key + "_")]
+    if not candidates:
+        raise ValueError(f"Unknown calculator '{name}'")
+    fitting = [spec for spec in candidates if set(spec.params) == set(inputs)]
+    if len(fitting) == 1:
+        return fitting[0]
+    options = "; ".join(f"{spec.name} ({', '.join(spec.params)})" for spec in (fitting or candidates))
+    raise ValueError(f"Name the calculator and its inputs exactly, one of: {options}")
+
+def parse_sweep(text: str):
+    """Parse "runoff, rainfall = 20..80 step 5, infiltration = 2..10, ..." into (calculator, {input: spec})."""
+    head, *parts = [part.strip() for part in text.split(",")]
+    inputs = {}
+    for part in parts:
+        name, sep, spec = part.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Expected 'input = value or range', got {part!r}")
+        inputs[_key(name)] = spec.strip()
+    return head, inputs
+
+class Sweep:
+    """A kernel over the grid of its input axes, evaluated chunk by chunk."""
+
+    def __init__(self, calculator: str, inputs, max_points: int):
+        specs = {_key(name): spec for name, spec in inputs.items()}
+        self.kernel = resolve_kernel(calculator, specs)
+        self.axes = [Axis.parse(param, specs[param]) for param in self.kernel.params]
+        self.shape = tuple(axis.size for axis in self.axes)
+        self.points = math.prod(self.shape)
+        if self.points > max_points:
+            raise SweepTooLarge(f"The sweep has {self.points} points; the limit is {max_points}")
+
+    def chunks(self, chunk_size: int):
+        """Yield ({input: values}, results) one chunk of grid points at a time, in row-major order."""
+        for start in range(0, self.points, chunk_size):
+            flat = np.arange(start, min(start + chunk_size, self.points), dtype=np.int64)
+            columns = {axis.name: axis.take(indices) for axis, indices in zip(self.axes, np.unravel_index(flat, self.shape))}
+            yield columns, self.kernel.func(*columns.values())
+
+    def rows(self, chunk_size: int):
+        """The sweep as JSON lines: a header naming the kernel, then one object per point."""
+        yield json.dumps({"kernel": self.kernel.name, "inputs": list(self.kernel.params), "unit": self.kernel.unit, "points": self.points}) + "\n"
+        # Parameter names are identifiers and every value is a finite float (repr is valid JSON) or null
+        template = "{{" + ", ".join(f'"{name}": {{}}' for name in (*self.kernel.params, "result")) + "}}\n"
+        for columns, results in self.chunks(chunk_size):
+            results = ["null" if math.isnan(value) else repr(value) for value in results.tolist()]
+            yield "".join(template.format(*row) for row in zip(*(column.tolist() for column in columns.values()), results))
+
+GOALS = ("at_least", "at_most")
+
+def goal_seek(calculator: str, inputs, solve_for: str, target: float, search: str = None, goal: str = None, fan_out: int = 1024):
+    """Find the smallest value of solve_for, on the search grid, whose result meets target.
+
+    inputs fixes every other input of the kernel. search is "start..stop
+    [step s]" or an open "start.. [step s]" (the default is 0.., step 1).
+    goal is "at_least" (result >= target) or "at_most" (result <= target).
+    By default it follows the direction of the formula, so the answer is
+    where the result first reaches the target from its starting side.
+
+    The search works on the kernel's rounded outputs, not the continuous
+    formula, so the answer is exactly the input at which the calculator's
+    ceil step lands on the target. One vectorized call over exponentially
+    spaced grid points brackets the answer. Each later call evaluates
+    fan_out points inside the bracket and keeps the sub-interval where
+    the goal starts to hold, so a 2^53-point grid takes about six rounds.
+    This relies on the goal holding from some point onwards, which is true
+    of every kernel in a single input.
+    """
+    specs = {_key(name): value for name, value in inputs.items()}
+    solve_for = _key(solve_for)
+    if solve_for in specs:
+        raise ValueError(f"'{solve_for}' is being solved for, so it cannot also be fixed")
+    kernel = resolve_kernel(calculator, [*specs, solve_for])
+    fixed = {name: _number(name, value) for name, value in specs.items()}
+    axis = Axis.parse_open(solve_for, search)
+    target = _number("target", target)
+    evaluations = 0
+
+    def results(indices):
+        nonlocal evaluations
+        evaluations += len(indices)
+        values = axis.take(indices)
+        return values, kernel.func(*(values if param == solve_for else fixed[param] for param in kernel.params))
+
+    # Bracket: index 0, then 2^j - 1 up to the end of the grid
+    probes = np.unique(np.minimum(np.concatenate(([0], 2 ** np.arange(0, int(axis.size).bit_length() + 1, dtype=np.int64) - 1)), axis.size - 1))
+    values, found = results(probes)
+    goal = _key(goal) if goal else None
+    if goal is None:
+        finite = found[~np.isnan(found)]
+        goal = "at_most" if len(finite) and finite[-1] < finite[0] else "at_least"
+    if goal not in GOALS:
+        raise ValueError(f"goal must be one of {', '.join(GOALS)}")
+    meets = (lambda found: found >= target) if goal == "at_least" else (lambda found: found <= target)
+
+    answer = {"kernel": kernel.name, "solve_for": solve_for, "target": target, "goal": goal, "fixed": fixed, "unit": kernel.unit}
+    hits = np.flatnonzero(meets(found))
+    if not len(hits):
+        message = f"No {solve_for} from {values[0].item()!r} to {values[-1].item()!r} gives a result {goal.replace('_', ' ')} {target!r}"
+        if not np.isnan(found).all():
+            message += f" (closest result: {(np.nanmax if goal == 'at_least' else np.nanmin)(found).item()!r})"
+        return {**answer, "solved": False, "input": None, "result": None, "below": None, "evaluations": evaluations, "message": message}
+    high = int(probes[hits[0]])
+    low = int(probes[hits[0] - 1]) if hits[0] else None
+
+    # Narrow (low, high] until they are neighbours; low never meets the goal, high always does
+    while low is not None and high - low > 1:
+        inside = np.unique(low + (high - low) * np.arange(1, fan_out + 1, dtype=np.int64) // (fan_out + 1))
+        inside = inside[(inside > low) & (inside < high)]
+        _, found = results(inside)
+        hits = np.flatnonzero(meets(found))
+        if len(hits):
+            high = int(inside[hits[0]])
+            low = int(inside[hits[0] - 1]) if hits[0] else low
+        else:
+            low = int(inside[-1])
+
+    values, found = results(np.array([high] if low is None else [low, high], dtype=np.int64))
+    below = None if low is None else {"input": values[0].item(), "result": None if np.isnan(found[0]) else found[0].item()}
+    return {**answer, "solved": True, "input": values[-1].item(), "result": found[-1].item(), "below": below, "evaluations": evaluations}
+
+def parse_goal_seek(text: str):
+    """Parse "renewable energy, energy generated = ?, energy consumption = 50000, target = 10".
+
+    The input marked "?" is solved for; a range after it ("? 0..1000 step
+    0.5") bounds the search. "goal = at most" flips the comparison.
+    """
+    calculator, inputs = parse_sweep(text)
+    if "target" not in inputs:
+        raise ValueError("Give the result to aim for as 'target = <number>'")
+    target = _number("target", inputs.pop("target"))
+    goal = inputs.pop("goal", None)
+    unknown = [name for name, spec in inputs.items() if spec.startswith("?")]
+    if len(unknown) != 1:
+        raise ValueError("Mark exactly one input to solve for with '?'")
+    solve_for = unknown[0]
+    search = inputs.pop(solve_for)[1:].strip() or None
+    return {"calculator": calculator, "inputs": inputs, "solve_for": solve_for, "target": target,
+            "search": search, "goal": goal}
@@ -0,0 +1,102 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from log_pipeline import BatchWriter
+
+class Trace:
+    """Spans recorded for one message, timed with time.perf_counter()."""
+    __slots__ = ("trace_id", "started", "wall_started", "spans", "attributes")
+
+    def __init__(self):
+        self.trace_id = os.urandom(8).hex()
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans = []
+        self.attributes = {}
+
+    def span(self, name: str, start: float, end: float):
+        self.spans.append((name, start, end))
+
+    def to_dict(self):
+        end = max((span_end for _, _, span_end in self.spans), default=self.started)
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.wall_started,
+            "duration_ms": round((end - self.started) * 1000, 3),
+            **self.attributes,
+            "spans": [
+                {"name": name, "offset_ms": round((start - self.started) * 1000, 3), "duration_ms": round((end - start) * 1000, 3)}
+                for name, start, end in self.spans
+            ],
+        }
+
+class _JSONLines:
+    def format(self, record):
+        return json.dumps(record, separators=(",", ":"))
+
+class Tracer:
+    """Samples messages for tracing and keeps finished traces.
+
+    start() returns a Trace for a sample_rate fraction of messages and None
+    otherwise, so untraced messages cost one random() call. Finished traces go
+    to a ring buffer of the last buffer_size traces and, when path is set, are
+    appended to a JSONL file by a background writer.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, buffer_size: int = 1000, path: str = None):
+        self.sample_rate = sample_rate
+        self.traces = deque(maxlen=buffer_size)
+        self.recorded = 0
+        self._queue = None
+        self._writer = None
+        if path:
+            self._queue = queue.Queue(maxsize=10000)
+            self._writer = BatchWriter(self._queue, open(path, "a", encoding="utf-8"), _JSONLines())
+            self._writer.start()
+            atexit.register(self._writer.stop)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a tracer from TRACE_SAMPLE (0 disables tracing), TRACE_BUFFER and TRACE_FILE."""
+        return cls(
+            sample_rate=float(os.getenv("TRACE_SAMPLE", 0.0)),
+            buffer_size=int(os.getenv("TRACE_BUFFER", 1000)),
+            path=os.getenv("TRACE_FILE"),
+        )
+
+    def start(self):
+        if self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate):
+            return Trace()
+        return None
+
+    def finish(self, trace: Trace):
+        record = trace.to_dict()
+        with self._lock:
+            self.traces.append(record)
+            self.recorded += 1
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                pass
+
+    def find(self, trace_id: str = None, min_duration_ms: float = 0.0, limit: int = 50):
+        """Most recent traces first, optionally one trace_id or only those at least min_duration_ms long."""
+        with self._lock:
+            traces = list(self.traces)
+        found = []
+        for record in reversed(traces):
+            if trace_id is not None and record["trace_id"] != trace_id:
+                continue
+            if record["duration_ms"] < min_duration_ms:
+                continue
+            found.append(record)
+            if len(found) >= limit:
+                break
+        return found